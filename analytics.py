@@ -0,0 +1,135 @@
+import numpy as np
+import pandas as pd
+
+from beneish import COMPONENTS
+
+# Columns ranked by default: the eight indices and the score itself
+RANKED_COLUMNS = (*COMPONENTS, "M-Score")
+
+UNIVERSE = "__universe__"
+
+
+def latest_scores(scores):
+    """Keep each ticker's most recent period, giving one cross-sectional row per ticker"""
+    return scores.groupby(level=0, sort=False).tail(1)
+
+
+def _sector_labels(scores, sectors):
+    tickers = scores.index.get_level_values(0)
+    if sectors is None:
+        return pd.Series("Unknown", index=scores.index)
+    labels = pd.Series(tickers.map(dict(sectors)), index=scores.index, dtype=object)
+    return labels.fillna("Unknown")
+
+
+def percentile_ranks(scores, sectors=None, columns=RANKED_COLUMNS):
+    """Percentile rank (0-1] of every column within the universe and within each sector.
+
+    `scores` is a calculate_m_scores_batch frame, usually one row per ticker (see
+    latest_scores); `sectors` maps ticker -> sector. Ties get their average rank.
+    Adds "<column>_pct_universe" and "<column>_pct_sector" columns.
+    """
+    values = scores[list(columns)]
+    universe = values.rank(method="average", pct=True)
+    sector = values.groupby(_sector_labels(scores, sectors).to_numpy()).rank(method="average", pct=True)
+
+    result = scores.copy()
+    for column in columns:
+        result[f"{column}_pct_universe"] = universe[column]
+        result[f"{column}_pct_sector"] = sector[column]
+    return result
+
+
+class PercentileIndex:
+    """Sorted value arrays per sector (and for the whole universe) that absorb new results incrementally.
+
+    add() merges a batch into the sorted arrays in linear time instead of re-sorting
+    everything, replacing a ticker's values when a batch brings the same or a later
+    period than the one indexed (an older period is ignored). ranks() then
+    answers percentile queries for any number of rows with binary searches.
+    """
+
+    def __init__(self, columns=RANKED_COLUMNS):
+        self.columns = tuple(columns)
+        self._sorted = {}  # (group, column) -> sorted float array
+        self._rows = {}  # ticker -> (sector, period, values) currently in the index
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _merge(self, group, column, add, remove):
+        # Incomplete scores (NaN) are not ranked
+        add, remove = add[~np.isnan(add)], remove[~np.isnan(remove)]
+        current = self._sorted.get((group, column), np.empty(0))
+        if len(remove):
+            # Drop one occurrence of each removed value
+            remove = np.sort(remove)
+            positions = np.searchsorted(current, remove, side="left")
+            positions += np.arange(len(remove)) - np.searchsorted(remove, remove, side="left")
+            found = positions < len(current)
+            found[found] = current[positions[found]] == remove[found]
+            if not found.all():
+                raise ValueError(f"removing values that are not in the {column} index of {group}")
+            current = np.delete(current, positions)
+        if len(add):
+            add = np.sort(add)
+            current = np.insert(current, np.searchsorted(current, add), add)
+        self._sorted[(group, column)] = current
+
+    def add(self, scores, sectors=None):
+        """Insert or update rows of a calculate_m_scores_batch frame.
+
+        A ticker appearing more than once (e.g. a multi-period frame) keeps only its
+        latest period, as in latest_scores.
+        """
+        # Batches may arrive in any order, so compare periods rather than arrival
+        scores = scores.iloc[np.argsort(scores.index.get_level_values(1).to_numpy(), kind="stable")]
+        scores = scores[~scores.index.get_level_values(0).duplicated(keep="last")]
+        tickers = scores.index.get_level_values(0)
+        periods = scores.index.get_level_values(1)
+        labels = _sector_labels(scores, sectors).to_numpy()
+        values = scores[list(self.columns)].to_numpy(dtype=float)
+
+        added = {}  # group -> list of value rows
+        removed = {}
+        for ticker, period, sector, row in zip(tickers, periods, labels, values):
+            previous = self._rows.get(ticker)
+            if previous is not None:
+                if previous[1] > period:
+                    continue
+                for group in (UNIVERSE, previous[0]):
+                    removed.setdefault(group, []).append(previous[2])
+            for group in (UNIVERSE, sector):
+                added.setdefault(group, []).append(row)
+            self._rows[ticker] = (sector, period, row)
+
+        empty = np.empty((0, len(self.columns)))
+        for group in set(added) | set(removed):
+            add = np.array(added.get(group, empty)).reshape(-1, len(self.columns))
+            remove = np.array(removed.get(group, empty)).reshape(-1, len(self.columns))
+            for i, column in enumerate(self.columns):
+                self._merge(group, column, add[:, i], remove[:, i])
+
+    def percentile(self, column, values, sector=None):
+        """Average-rank percentile of values against the universe or one sector"""
+        ranked = self._sorted.get((sector or UNIVERSE, column), np.empty(0))
+        values = np.asarray(values, dtype=float)
+        if not len(ranked):
+            return np.full(values.shape, np.nan)
+        below = np.searchsorted(ranked, values, side="left")
+        at_or_below = np.searchsorted(ranked, values, side="right")
+        return np.where(np.isnan(values), np.nan, (below + at_or_below + 1) / 2 / len(ranked))
+
+    def ranks(self, scores, sectors=None):
+        """Like percentile_ranks(scores, sectors) but against everything added so far"""
+        labels = _sector_labels(scores, sectors).to_numpy()
+        result = scores.copy()
+        for column in self.columns:
+            values = scores[column].to_numpy(dtype=float)
+            result[f"{column}_pct_universe"] = self.percentile(column, values)
+            sector_pct = np.full(len(values), np.nan)
+            for sector in np.unique(labels):
+                mask = labels == sector
+                sector_pct[mask] = self.percentile(column, values[mask], sector)
+            result[f"{column}_pct_sector"] = sector_pct
+        return result
@@ -1,16 +1,124 @@
+import os
+import threading
+
 import streamlit as st
-from beneish import fetch_financial_data, calculate_m_score, interpret_m_score
+from streamlit.runtime.scriptrunner import add_script_run_ctx, get_script_run_ctx
+
+from beneish import (COMPONENTS, M_SCORE_THRESHOLD, TokenBucket, calculate_m_scores_batch,
+                     fetch_financial_history, fetch_many, interpret_m_score, panel_from_history)
+from statement_cache import StatementCache
+
+# Scores are memoized in-process for this long; statements also persist on disk
+CACHE_TTL = 6 * 3600
+MAX_WORKERS = 8
+# Fetches per second to Yahoo Finance, shared by every session in the process
+RATE_LIMIT = 5.0
 
 # Streamlit app configuration
 st.set_page_config(page_title="Beneish M-Score Calculator", layout="wide")
 st.title("🚀 Beneish M-Score Calculator")
 st.markdown("""
 **Detect earnings manipulation** using the Beneish M-Score model.  
-Enter a stock ticker below (e.g., `AAPL`, `TSLA`):
+Enter one or more stock tickers below, separated by commas (e.g., `AAPL, TSLA`):
 """)
 
+@st.cache_resource
+def get_statement_cache():
+    # Shared by every session in this process, and by other processes using the same directory
+    return StatementCache(os.environ.get("BENEISH_CACHE_DIR", ".beneish_cache"), ttl=CACHE_TTL,
+                          refresh_on_new_period=True)
+
+@st.cache_resource
+def get_rate_limiter():
+    return TokenBucket(RATE_LIMIT)
+
+@st.cache_resource
+def get_ticker_locks():
+    return {}, threading.Lock()
+
+def ticker_lock(ticker):
+    # Concurrent sessions asking for the same ticker wait for one fetch instead of duplicating it
+    locks, guard = get_ticker_locks()
+    with guard:
+        return locks.setdefault(ticker, threading.Lock())
+
+@st.cache_data(ttl=CACHE_TTL, show_spinner=False)
+def score_ticker(ticker):
+    """M-Scores for every consecutive pair of fiscal periods, or None when data is insufficient"""
+    with ticker_lock(ticker):
+        history = fetch_financial_history(ticker, cache=get_statement_cache(), bucket=get_rate_limiter())
+    if history is None or len(history) < 2:
+        return None
+    return calculate_m_scores_batch(panel_from_history({ticker: history}))
+
+def score_tickers(tickers):
+    """Yield (ticker, scores) as each ticker finishes, fetching up to MAX_WORKERS at once"""
+    ctx = get_script_run_ctx()
+
+    def fetcher(ticker):
+        # Worker threads need the script context to use Streamlit's caches
+        add_script_run_ctx(threading.current_thread(), ctx)
+        return score_ticker(ticker)
+
+    # Only downloads are throttled (see score_ticker); memoized scores and cached statements return at once
+    yield from fetch_many(tickers, max_workers=min(MAX_WORKERS, len(tickers)), rate_limit=None, fetcher=fetcher)
+
+def render_ticker(container, ticker, scores, expanded=True):
+    if scores is None:
+        container.error(f"{ticker}: failed to fetch data. Check if the ticker is valid or has complete financial statements.")
+        return
+
+    # Latest fiscal period (t vs t-1)
+    (_, period), latest = next(scores.iloc[::-1].iterrows())
+    m_score = latest["M-Score"]
+    components = {key: latest[key] for key in COMPONENTS}
+    interpretation = interpret_m_score(m_score, components)
+
+    if m_score != m_score:
+        missing = ", ".join(key for key, value in components.items() if value != value)
+        container.warning(f"{ticker}: incomplete data for the fiscal period ending {period:%Y-%m-%d}; "
+                          f"{missing} can't be calculated, so no M-Score is reported.")
+        return
+
+    with container.expander(f"**{ticker}** — M-Score {m_score:.2f} (fiscal period ending {period:%Y-%m-%d})",
+                            expanded=expanded):
+        if m_score > M_SCORE_THRESHOLD:
+            st.error("⚠️ **High probability of earnings manipulation**")
+        else:
+            st.success("✅ **Low probability of earnings manipulation**")
+
+        # Show component breakdown
+        st.subheader("Component Analysis:")
+        col1, col2 = st.columns(2)
+        for key, value in components.items():
+            col1.metric(label=key, value=f"{value:.2f}")
+
+        # Show interpretations
+        st.subheader("Red Flags:")
+        for key, desc in interpretation["components"].items():
+            if "High" in desc:
+                st.error(f"- {key}: {desc}")
+            else:
+                st.success(f"- {key}: {desc}")
+
+        # Score history across all available periods
+        if len(scores) > 1:
+            st.subheader("M-Score History:")
+            st.line_chart(scores["M-Score"].droplevel(0))
+
+def comparison_row(ticker, scores):
+    (_, period), latest = next(scores.iloc[::-1].iterrows())
+    return {
+        "Ticker": ticker,
+        "Period": period.date(),
+        "M-Score": latest["M-Score"],
+        "Flag": "Incomplete" if latest["M-Score"] != latest["M-Score"] else "High" if latest["Manipulation Flag"] else "Low",
+        **{key: latest[key] for key in COMPONENTS},
+    }
+
 # User input
-ticker = st.text_input("Enter a ticker symbol:", placeholder="TSLA").upper()
+raw_tickers = st.text_input("Enter ticker symbols:", placeholder="TSLA, AAPL").upper()
+tickers = list(dict.fromkeys(t.strip() for t in raw_tickers.replace(" ", ",").split(",") if t.strip()))
 
 # Add a collapsible section for ratio explanations
 with st.expander("📚 **What are the Beneish M-Score Ratios?**"):
@@ -51,41 +159,31 @@ with st.expander("📚 **What are the Beneish M-Score Ratios?**"):
     """)
 
 if st.button("Analyze"):
-    if not ticker:
+    if not tickers:
         st.error("Please enter a ticker symbol.")
     else:
-        with st.spinner("Fetching data and calculating..."):
+        # Placeholders keep the input order while results arrive in completion order
+        st.subheader("Comparison:")
+        table = st.empty()
+        progress = st.progress(0.0, text="Fetching data and calculating...")
+        containers = {ticker: st.container() for ticker in tickers}
+        # Loaded here rather than at the top so the page renders before pandas is imported
+        import pandas as pd
+
+        rows = []
+        for done, (ticker, scores) in enumerate(score_tickers(tickers), start=1):
             try:
-                # Fetch data
-                data = fetch_financial_data(ticker)
-                
-                if data:
-                    # Calculate M-Score for the latest year (t vs t-1)
-                    m_score, components, _ = calculate_m_score(data, "t", "t-1")
-                    interpretation = interpret_m_score(m_score, components)
-                    
-                    # Display results
-                    st.success(f"**M-Score for {ticker}: {m_score:.2f}**")
-                    if m_score > -1.78:
-                        st.error("⚠️ **High probability of earnings manipulation**")
-                    else:
-                        st.success("✅ **Low probability of earnings manipulation**")
-                    
-                    # Show component breakdown
-                    st.subheader("Component Analysis:")
-                    col1, col2 = st.columns(2)
-                    for key, value in components.items():
-                        col1.metric(label=key, value=f"{value:.2f}")
-                    
-                    # Show interpretations
-                    st.subheader("Red Flags:")
-                    for key, desc in interpretation["components"].items():
-                        if "High" in desc:
-                            st.error(f"- {key}: {desc}")
-                        else:
-                            st.success(f"- {key}: {desc}")
-                else:
-                    st.error("Failed to fetch data. Check if the ticker is valid or has complete financial statements.")
-                    
+                render_ticker(containers[ticker], ticker, scores, expanded=len(tickers) == 1)
+                if scores is not None:
+                    rows.append(comparison_row(ticker, scores))
             except Exception as e:
-                st.error(f"Error: {str(e)}")
+                containers[ticker].error(f"{ticker}: Error: {str(e)}")
+
+            # Column headers of st.dataframe sort on click
+            if rows:
+                comparison = pd.DataFrame(rows).sort_values("M-Score", ascending=False)
+                table.dataframe(comparison, hide_index=True, width="stretch",
+                                column_config={key: st.column_config.NumberColumn(format="%.3f")
+                                               for key in ["M-Score", *COMPONENTS]})
+            progress.progress(done / len(tickers), text=f"Analyzed {done} of {len(tickers)} tickers")
+        progress.empty()
@@ -0,0 +1,307 @@
+#!/usr/bin/env python
+"""Benchmark the fetch, parse, score and render stages on synthetic statements.
+
+    python benchmark.py                       # 1, 1k and 100k tickers
+    python benchmark.py --sizes 1 1000 --output bench_results.json --compare old.json
+
+Statements are generated in the shape yfinance returns them (line items as rows,
+period ends as columns, newest first), including missing cells, whole line items
+left out of a statement, zero values and banks without 'Cost Of Revenue'. The fetch stage runs fetch_many against an
+in-memory stub, so no network I/O happens. Rendering is timed through
+interpret_m_score and print_report into a buffer; the Streamlit widgets themselves
+are not measured.
+
+Every stage reports wall time, throughput and peak traced memory. Scalar and
+batch scores are compared for numerical equality. The results file is JSON so
+runs can be diffed between commits (--compare prints the speedup per stage).
+
+Before the stages run, each module in IMPORT_BUDGETS is imported in a fresh
+interpreter; the run fails if the median import time exceeds its budget or if it
+loads one of the packages it must leave for first use (--imports-only runs just
+this check).
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import logging
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+from beneish import (COMPONENTS, LINE_ITEMS, STATEMENT_ROWS, StatementSnapshot, calculate_m_scores_batch,
+                     extract_history, fetch_many, interpret_m_score, panel_from_history, print_report,
+                     score_snapshots)
+
+# Cold-start import budget in seconds, and packages the import must not load
+IMPORT_BUDGETS = {
+    "beneish": 0.15,
+    "metrics": 0.05,
+}
+LAZY_PACKAGES = ("numpy", "pandas", "yfinance", "pyarrow", "requests")
+
+IMPORT_PROBE = """
+import sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+loaded = sorted({{name.split(".")[0] for name in sys.modules}} & set({lazy!r}))
+print(seconds, *loaded)
+"""
+
+# Extra rows yfinance reports that the model doesn't use
+FILLER_ROWS = (
+    ["Gross Profit", "Operating Income", "EBITDA", "Tax Provision"],
+    ["Cash And Cash Equivalents", "Inventory", "Goodwill", "Stockholders Equity"],
+    ["Capital Expenditure", "Free Cash Flow", "Change In Working Capital"],
+)
+
+
+def synthetic_statements(rng, periods=4, bank=False, missing_rate=0.02, zero_rate=0.02, drop_rate=0.01):
+    """Return (income_stmt, balance_sheet, cash_flow) shaped like yfinance's frames.
+
+    missing_rate and zero_rate apply per cell; drop_rate leaves a line item's row out entirely.
+    """
+    end = pd.Timestamp("2024-12-31")
+    columns = pd.DatetimeIndex([end - pd.DateOffset(years=i) for i in range(periods)])
+
+    # Grow a plausible company backwards in time from a random size
+    revenue = rng.lognormal(20, 1.5) * np.cumprod(np.r_[1.0, rng.normal(0.92, 0.1, periods - 1)])
+    total_assets = revenue * rng.uniform(0.8, 2.5)
+    values = {
+        "Total Revenue": revenue,
+        "Cost Of Revenue": revenue * rng.uniform(0.3, 0.8, periods),
+        "Selling General And Administration": revenue * rng.uniform(0.05, 0.3, periods),
+        "Net Income": revenue * rng.normal(0.08, 0.1, periods),
+        "Accounts Receivable": revenue * rng.uniform(0.05, 0.25, periods),
+        "Current Assets": total_assets * rng.uniform(0.2, 0.5, periods),
+        "Net PPE": total_assets * rng.uniform(0.1, 0.4, periods),
+        "Total Assets": total_assets,
+        "Total Liabilities Net Minority Interest": total_assets * rng.uniform(0.3, 0.8, periods),
+        "Depreciation": total_assets * rng.uniform(0.01, 0.05, periods),
+        "Operating Cash Flow": revenue * rng.normal(0.12, 0.08, periods),
+    }
+
+    statements = []
+    for position, filler in enumerate(FILLER_ROWS):
+        items = [item for item in LINE_ITEMS if STATEMENT_ROWS[item][0] == position]
+        if bank:
+            items = [item for item in items if item != "Cost Of Revenue"]
+        items = [item for item in items if rng.random() >= drop_rate]
+        rows = np.array([values[item] for item in items] + [revenue * rng.random(periods) for _ in filler])
+        rows[rng.random(rows.shape) < missing_rate] = np.nan
+        rows[rng.random(rows.shape) < zero_rate] = 0.0
+        labels = [STATEMENT_ROWS[item][1] for item in items] + filler
+        statements.append(pd.DataFrame(rows, index=labels, columns=columns))
+    return tuple(statements)
+
+
+def synthetic_universe(seed=0, unique=1000, bank_rate=0.03):
+    """Return {ticker: statements} for `unique` synthetic companies"""
+    rng = np.random.default_rng(seed)
+    return {
+        f"SYN{i:05d}": synthetic_statements(rng, bank=rng.random() < bank_rate)
+        for i in range(unique)
+    }
+
+
+def tickers_for(size, universe):
+    # Larger sizes cycle through the synthetic companies so memory stays bounded
+    names = list(universe)
+    return [f"{names[i % len(names)]}.{i // len(names)}" for i in range(size)]
+
+
+def statements_for(ticker, universe):
+    return universe[ticker.split(".")[0]]
+
+
+def stage_fetch(tickers, universe):
+    fetched = fetch_many(tickers, max_workers=8, rate_limit=None,
+                         fetcher=lambda ticker: statements_for(ticker, universe))
+    return sum(1 for _ in fetched)
+
+
+def stage_parse(tickers, universe):
+    return {ticker: extract_history(*statements_for(ticker, universe)) for ticker in tickers}
+
+
+def stage_score_scalar(histories):
+    scores = []
+    for history in histories.values():
+        rows = history.to_numpy()
+        for i in range(1, len(rows)):
+            result = score_snapshots(StatementSnapshot(*rows[i]), StatementSnapshot(*rows[i - 1]))
+            scores.append(result.m_score)
+    return np.array(scores)
+
+
+def stage_score_batch(histories):
+    return calculate_m_scores_batch(panel_from_history(histories))
+
+
+def stage_render(scores):
+    # Latest period per ticker, as the interactive report would show it
+    latest = scores.groupby(level=0, sort=False).tail(1)
+    buffer = io.StringIO()
+    with contextlib.redirect_stdout(buffer):
+        for (ticker, period), row in latest.iterrows():
+            components = {key: row[key] for key in COMPONENTS}
+            weighted = {key: row[f"{key}_weighted"] for key in components}
+            interpretation = interpret_m_score(row["M-Score"], components)
+            print_report(f"{period:%Y-%m-%d}", ticker, row["M-Score"], components, weighted, interpretation)
+    return len(latest)
+
+
+def measure_import(module, budget, repeat=5):
+    """Import module in `repeat` fresh interpreters; returns a record with the median time"""
+    timings = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module, lazy=LAZY_PACKAGES)],
+                                capture_output=True, text=True, check=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.split()
+        timings.append(float(output[0]))
+        loaded = output[1:]
+    seconds = sorted(timings)[len(timings) // 2]
+    return {
+        "module": module,
+        "seconds": seconds,
+        "budget": budget,
+        "eager_packages": loaded,
+        "ok": seconds <= budget and not loaded,
+    }
+
+
+def measure(stage, size, function, *args, memory=True):
+    """Run one stage, returning (result, record) with wall time, throughput and peak memory"""
+    start = time.perf_counter()
+    result = function(*args)
+    seconds = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        # Separate traced run so tracing overhead doesn't distort the timing
+        tracemalloc.start()
+        function(*args)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    record = {
+        "stage": stage,
+        "tickers": size,
+        "seconds": seconds,
+        "tickers_per_second": size / seconds if seconds else None,
+        "peak_bytes": peak,
+    }
+    return result, record
+
+
+def run(sizes, unique=1000, seed=0, memory=True):
+    universe = synthetic_universe(seed, unique=min(unique, max(sizes)))
+    records = []
+    equality = []
+    for size in sizes:
+        tickers = tickers_for(size, universe)
+        _, record = measure("fetch", size, stage_fetch, tickers, universe, memory=memory)
+        records.append(record)
+        histories, record = measure("parse", size, stage_parse, tickers, universe, memory=memory)
+        records.append(record)
+        scalar, record = measure("score_scalar", size, stage_score_scalar, histories, memory=memory)
+        records.append(record)
+        batch, record = measure("score_batch", size, stage_score_batch, histories, memory=memory)
+        records.append(record)
+        _, record = measure("render", size, stage_render, batch, memory=memory)
+        records.append(record)
+
+        # Incomplete rows are NaN in both engines
+        batch_scores = batch["M-Score"].to_numpy()
+        same_missing = len(scalar) == len(batch) and bool((np.isnan(scalar) == np.isnan(batch_scores)).all())
+        complete = ~np.isnan(scalar)
+        difference = (float(np.max(np.abs(scalar[complete] - batch_scores[complete])))
+                      if same_missing and complete.any() else 0.0)
+        equality.append({
+            "tickers": size,
+            "scores": len(scalar),
+            "incomplete": int(np.count_nonzero(~complete)),
+            "max_abs_difference": difference,
+            "equal": same_missing and difference <= 1e-9,
+        })
+        print(f"{size} tickers done", file=sys.stderr)
+    return records, equality
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_table(records, baseline=None):
+    previous = {(r["stage"], r["tickers"]): r for r in (baseline or {}).get("results", [])}
+    print(f"{'stage':<14}{'tickers':>9}{'seconds':>12}{'tickers/s':>14}{'peak MiB':>10}{'speedup':>9}")
+    for r in records:
+        peak = f"{r['peak_bytes'] / 2**20:.1f}" if r["peak_bytes"] is not None else "-"
+        old = previous.get((r["stage"], r["tickers"]))
+        speedup = f"{old['seconds'] / r['seconds']:.2f}x" if old and r["seconds"] else ""
+        rate = r["tickers_per_second"] or 0
+        print(f"{r['stage']:<14}{r['tickers']:>9}{r['seconds']:>12.4f}{rate:>14.0f}{peak:>10}{speedup:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 1000, 100000])
+    parser.add_argument("--unique", type=int, default=1000, help="Distinct synthetic companies")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced memory runs")
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--compare", help="Earlier results file to compare against")
+    parser.add_argument("--imports-only", action="store_true", help="Only check the import-time budgets")
+    args = parser.parse_args(argv)
+    # Per-row warnings about incomplete or replaced indices would dominate the scalar timing
+    logging.getLogger("beneish").setLevel(logging.ERROR)
+
+    imports = [measure_import(module, budget) for module, budget in IMPORT_BUDGETS.items()]
+    for check in imports:
+        status = "OK" if check["ok"] else "OVER BUDGET"
+        eager = f", loads {', '.join(check['eager_packages'])}" if check["eager_packages"] else ""
+        print(f"import {check['module']}: {check['seconds'] * 1000:.1f} ms "
+              f"(budget {check['budget'] * 1000:.0f} ms{eager}): {status}")
+    imports_ok = all(check["ok"] for check in imports)
+    if args.imports_only:
+        return 0 if imports_ok else 1
+
+    records, equality = run(args.sizes, unique=args.unique, seed=args.seed, memory=not args.no_memory)
+    results = {
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "imports": imports,
+        "results": records,
+        "equality": equality,
+    }
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+    print_table(records, baseline)
+    for check in equality:
+        status = "OK" if check["equal"] else "MISMATCH"
+        print(f"scalar vs batch, {check['tickers']} tickers: {status} (max |diff| {check['max_abs_difference']:.3g})")
+    return 0 if imports_ok and all(check["equal"] for check in equality) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,22 @@
 # In[8]:
 
 
-import yfinance as yf
+import contextlib
+import logging
+import random
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field, fields
+
+import metrics
+
+# numpy, pandas and yfinance are imported inside the functions that use them, so
+# scoring data already in hand (calculate_m_score, interpret_m_score) pulls in no
+# third-party packages and short-lived processes don't pay for them at startup.
+
+logger = logging.getLogger("beneish")
 
 # Beneish M-Score Formula Coefficients
 coefficients = {
@@ -19,158 +34,747 @@ coefficients = {
     "Constant": -4.84
 }
 
-def fetch_financial_data(ticker):
-    print(f"Fetching financial data for {ticker}...")
+# The eight indices of the model, in report order
+COMPONENTS = ("DSRI", "GMI", "AQI", "SGI", "DEPI", "SGAI", "TATA", "LVGI")
+
+# Line items collected per period (the keys of the data dict without the _t / _t-1 / _t-2 suffix)
+LINE_ITEMS = (
+    "Total Revenue",
+    "Cost Of Revenue",
+    "Selling General And Administration",
+    "Net Income",
+    "Accounts Receivable",
+    "Current Assets",
+    "Net PPE",
+    "Total Assets",
+    "Total Liabilities Net Minority Interest",
+    "Depreciation",
+    "Operating Cash Flow",
+)
+
+# Scores at or above this value suggest a high probability of earnings manipulation
+M_SCORE_THRESHOLD = -1.78
+
+# Index values above these thresholds are flagged "High" by interpret_m_score
+COMPONENT_THRESHOLDS = {
+    "DSRI": 1.031,
+    "GMI": 1.193,
+    "AQI": 1.254,
+    "SGI": 1.607,
+    "DEPI": 1.077,
+    "SGAI": 1.041,
+    "TATA": 0.018,
+    "LVGI": 1.111,
+}
+
+# Quarterly (TTM) histories compare each trailing-twelve-month window with the one
+# four quarters earlier, so the annual coefficients keep applying
+TTM_LAG = 4
+
+# Days between consecutive quarter ends (52/53-week fiscal years included)
+QUARTER_DAYS = (80, 100)
+
+# Line items each index reads from the (current, prior) period; an index with any of
+# them missing is left unscored (NaN) instead of being set to the neutral 1.0
+COMPONENT_INPUTS = {
+    "DSRI": (("Accounts Receivable", "Total Revenue"),) * 2,
+    "GMI": (("Total Revenue", "Cost Of Revenue"),) * 2,
+    "AQI": (("Current Assets", "Net PPE", "Total Assets"),) * 2,
+    "SGI": (("Total Revenue",),) * 2,
+    "DEPI": (("Depreciation", "Net PPE"),) * 2,
+    "SGAI": (("Selling General And Administration", "Total Revenue"),) * 2,
+    "TATA": (("Net Income", "Operating Cash Flow", "Total Assets"), ()),
+    "LVGI": (("Total Liabilities Net Minority Interest", "Total Assets"),) * 2,
+}
+
+# Where each line item lives in the yfinance statements: (statement position, row label)
+STATEMENT_ROWS = {
+    "Total Revenue": (0, "Total Revenue"),
+    "Cost Of Revenue": (0, "Cost Of Revenue"),
+    "Selling General And Administration": (0, "Selling General And Administration"),
+    "Net Income": (0, "Net Income"),
+    "Accounts Receivable": (1, "Accounts Receivable"),
+    "Current Assets": (1, "Current Assets"),
+    "Net PPE": (1, "Net PPE"),
+    "Total Assets": (1, "Total Assets"),
+    "Total Liabilities Net Minority Interest": (1, "Total Liabilities Net Minority Interest"),
+    "Depreciation": (2, "Depreciation And Amortization"),
+    "Operating Cash Flow": (2, "Operating Cash Flow"),
+}
+
+@dataclass(frozen=True, slots=True)
+class ItemSource:
+    """One way to read a line item: a sum of signed rows from one statement"""
+    kind: str  # "reported", "alias", "derived" or "substitute"
+    statement: int
+    terms: tuple  # ((row label, sign), ...)
+
+    def describe(self):
+        if self.kind == "reported":
+            return "reported"
+        expression = self.terms[0][0]
+        for label, sign in self.terms[1:]:
+            expression += f" {'+' if sign > 0 else '-'} {label}"
+        return f"{self.kind}: {expression}"
+
+def _row(kind, statement, label):
+    return ItemSource(kind, statement, ((label, 1),))
+
+# Sources for each line item in order of preference: the row yfinance normally reports,
+# synonyms used for some filers, values derived from other rows, and substitutes used
+# by sectors (mostly banks and insurers) that don't report the item at all
+LINE_ITEM_SOURCES = {
+    "Total Revenue": [
+        _row("alias", 0, "Operating Revenue"),
+    ],
+    "Cost Of Revenue": [
+        _row("alias", 0, "Reconciled Cost Of Revenue"),
+        ItemSource("derived", 0, (("Total Revenue", 1), ("Gross Profit", -1))),
+        _row("substitute", 0, "Interest Expense"),
+    ],
+    "Selling General And Administration": [
+        ItemSource("derived", 0, (("General And Administrative Expense", 1), ("Selling And Marketing Expense", 1))),
+        _row("alias", 0, "General And Administrative Expense"),
+        _row("substitute", 0, "Non Interest Expense"),
+    ],
+    "Net Income": [
+        _row("alias", 0, "Net Income Common Stockholders"),
+        _row("alias", 0, "Net Income From Continuing Operation Net Minority Interest"),
+    ],
+    "Accounts Receivable": [
+        _row("alias", 1, "Receivables"),
+        _row("alias", 1, "Gross Accounts Receivable"),
+    ],
+    "Current Assets": [
+        _row("substitute", 1, "Cash Cash Equivalents And Short Term Investments"),
+        _row("substitute", 1, "Cash And Cash Equivalents"),
+    ],
+    "Net PPE": [
+        ItemSource("derived", 1, (("Gross PPE", 1), ("Accumulated Depreciation", 1))),  # reported negative
+    ],
+    "Total Assets": [],
+    "Total Liabilities Net Minority Interest": [
+        _row("alias", 1, "Total Liabilities"),
+        ItemSource("derived", 1, (("Total Assets", 1), ("Total Equity Gross Minority Interest", -1))),
+    ],
+    "Depreciation": [
+        _row("alias", 2, "Depreciation Amortization Depletion"),
+        _row("alias", 2, "Depreciation"),
+        _row("alias", 0, "Reconciled Depreciation"),
+    ],
+    "Operating Cash Flow": [
+        _row("alias", 2, "Cash Flow From Continuing Operating Activities"),
+    ],
+}
+for _item, (_statement, _label) in STATEMENT_ROWS.items():
+    LINE_ITEM_SOURCES[_item].insert(0, _row("reported", _statement, _label))
+
+# Every row label any source needs, per statement, to cut each frame's index down to one set lookup
+_WANTED_LABELS = [
+    {label for sources in LINE_ITEM_SOURCES.values() for source in sources
+     if source.statement == position for label, _ in source.terms}
+    for position in range(3)
+]
+
+def resolve_line_items(statements):
+    """List the sources of every line item whose rows are all present, most preferred first.
+
+    Returns {item: [ItemSource, ...]}, with an empty list for items that can't be
+    read at all. Each statement's index is scanned once.
+    """
+    present = [wanted.intersection(statement.index) for wanted, statement in zip(_WANTED_LABELS, statements)]
+    return {
+        item: [source for source in LINE_ITEM_SOURCES[item]
+               if all(label in present[source.statement] for label, _ in source.terms)]
+        for item in LINE_ITEMS
+    }
+
+def fetch_statements(ticker, cache=None, quarterly=False, bucket=None):
+    """Return (income_stmt, balance_sheet, cash_flow) for ticker, from `cache` when it holds a fresh copy.
+
+    A TokenBucket passed as `bucket` is only drawn from when the statements are downloaded.
+    """
+    if cache is not None:
+        statements = cache.get(ticker, quarterly)
+        if statements is not None:
+            return statements
+
+    if bucket is not None:
+        bucket.acquire()
+    import yfinance as yf
     stock = yf.Ticker(ticker)
-    income_stmt = stock.income_stmt
-    balance_sheet = stock.balance_sheet
-    cash_flow = stock.cash_flow
-    
-    data = {}
-    
+    prefix = "quarterly_" if quarterly else ""
+    statements = []
+    for name in ("income_stmt", "balance_sheet", "cash_flow"):
+        # Each attribute access is a separate network request
+        with metrics.timer(f"fetch.{prefix}{name}"):
+            statements.append(getattr(stock, prefix + name))
+    statements = tuple(statements)
+
+    if cache is not None:
+        cache.put(ticker, statements, quarterly)
+    return statements
+
+def extract_history(income_stmt, balance_sheet, cash_flow, ttm=False):
+    """Return a period x line item DataFrame from yfinance statements, oldest period first.
+
+    Each line item is resolved through LINE_ITEM_SOURCES (see resolve_line_items) and
+    whole rows are sliced from each statement at once; only fiscal periods reported
+    in all statements that supply an item are kept. Every period takes the first
+    reported, alias or derived source with a value for it, so a reported row with
+    gaps falls back period by period. A substitute measures something else, so it is
+    only used when none of those has any value, and then one substitute serves every
+    period. Values left without a source stay NaN (the indices built from them are
+    then left unscored) and periods with no values at all are dropped.
+    history.attrs["provenance"] records where every item came from. With ttm=True the statements are quarterly and
+    income statement and cash flow items are summed over the trailing four quarters;
+    only the latest run of consecutive quarters is used, so no sum spans a gap.
+    Score TTM histories with lag=TTM_LAG.
+    """
+    import numpy as np
+    import pandas as pd
+
+    statements = (income_stmt, balance_sheet, cash_flow)
+    candidates = resolve_line_items(statements)
+    used = sorted({source.statement for sources in candidates.values() for source in sources})
+
+    periods = None
+    for position in used:
+        columns = statements[position].columns
+        periods = columns if periods is None else periods.intersection(columns)
+    periods = pd.DatetimeIndex([] if periods is None else periods, name="period").sort_values()
+
+    # Positional take on the raw arrays; label-based .loc is the slow part for small frames
+    rows = {}
+    for position in used:
+        labels = list(dict.fromkeys(
+            label for sources in candidates.values() for source in sources if source.statement == position
+            for label, _ in source.terms
+        ))
+        statement = statements[position]
+        if not statement.index.is_unique:
+            statement = statement[~statement.index.duplicated()]
+        taken = statement.to_numpy(dtype=float)[np.ix_(statement.index.get_indexer(labels),
+                                                       statement.columns.get_indexer(periods))]
+        rows.update(((position, label), taken[i]) for i, label in enumerate(labels))
+
+    values = np.full((len(periods), len(LINE_ITEMS)), np.nan)
+    provenance = {}
+    for j, item in enumerate(LINE_ITEMS):
+        column = values[:, j]
+        used_sources = []
+
+        def fill_gaps(source):
+            candidate = sum(sign * rows[(source.statement, label)] for label, sign in source.terms)
+            fill = np.isnan(column) & ~np.isnan(candidate)
+            if fill.any():
+                column[fill] = candidate[fill]
+                used_sources.append(source)
+                if metrics.enabled and source.kind != "reported":
+                    metrics.incr("line_item_fallback", int(np.count_nonzero(fill)), item=item, kind=source.kind)
+
+        for source in candidates[item]:
+            if source.kind != "substitute" and np.isnan(column).any():
+                fill_gaps(source)
+        # Mixing a substitute with reported values would compare different quantities across periods
+        if not used_sources:
+            for source in candidates[item]:
+                if source.kind == "substitute":
+                    fill_gaps(source)
+                    if used_sources:
+                        break
+        if metrics.enabled and np.isnan(column).any():
+            metrics.incr("line_item_fallback", int(np.count_nonzero(np.isnan(column))), item=item, kind="missing")
+        provenance[item] = ", ".join(source.describe() for source in used_sources) or "missing"
+
+    # yfinance often lists an oldest period with no values at all
+    reported = ~np.isnan(values).all(axis=1)
+    history = pd.DataFrame(values[reported], index=periods[reported], columns=list(LINE_ITEMS))
+    history.attrs["provenance"] = provenance
+
+    if ttm:
+        history = _latest_contiguous_quarters(history)
+        flows = [item for item in LINE_ITEMS if STATEMENT_ROWS[item][0] != 1]
+        history[flows] = history[flows].rolling(4, min_periods=4).sum()
+        history = history.iloc[3:]
+    return history
+
+def _latest_contiguous_quarters(history):
+    # A missing quarter would make a rolling four-row sum cover five quarters
+    gaps = history.index.to_series().diff().dt.days.to_numpy()
+    breaks = [i for i in range(1, len(gaps)) if not QUARTER_DAYS[0] <= gaps[i] <= QUARTER_DAYS[1]]
+    if not breaks:
+        return history
+    if metrics.enabled:
+        metrics.incr("ttm_gap")
+    start = breaks[-1]
+    logger.warning("Quarterly statements skip a quarter before %s; using only the %d quarters from there on.",
+                   f"{history.index[start]:%Y-%m-%d}", len(history) - start)
+    return history.iloc[start:]
+
+def fetch_financial_history(ticker, quarterly=False, cache=None, bucket=None):
+    """Fetch every fiscal period available for ticker (see extract_history), or None on failure"""
+    logger.info("Fetching financial data for %s...", ticker)
+    statements = fetch_statements(ticker, cache, quarterly, bucket)
+
     try:
-        # Income Statement (Current Year: t, Prior Year: t-1, Previous Year: t-2)
-        data["Total Revenue_t"] = income_stmt.loc['Total Revenue'].iloc[0] 
-        data["Total Revenue_t-1"] = income_stmt.loc['Total Revenue'].iloc[1] 
-        data["Total Revenue_t-2"] = income_stmt.loc['Total Revenue'].iloc[2] 
-        data["Cost Of Revenue_t"] = income_stmt.loc['Cost Of Revenue'].iloc[0] 
-        data["Cost Of Revenue_t-1"] = income_stmt.loc['Cost Of Revenue'].iloc[1] 
-        data["Cost Of Revenue_t-2"] = income_stmt.loc['Cost Of Revenue'].iloc[2] 
-        data["Selling General And Administration_t"] = income_stmt.loc['Selling General And Administration'].iloc[0]
-        data["Selling General And Administration_t-1"] = income_stmt.loc['Selling General And Administration'].iloc[1]
-        data["Selling General And Administration_t-2"] = income_stmt.loc['Selling General And Administration'].iloc[2]
-        data["Net Income_t"] = income_stmt.loc['Net Income'].iloc[0]
-        data["Net Income_t-1"] = income_stmt.loc['Net Income'].iloc[1]
-        data["Net Income_t-2"] = income_stmt.loc['Net Income'].iloc[2]
-        
-        # Balance Sheet
-        data["Accounts Receivable_t"] = balance_sheet.loc['Accounts Receivable'].iloc[0]
-        data["Accounts Receivable_t-1"] = balance_sheet.loc['Accounts Receivable'].iloc[1]
-        data["Accounts Receivable_t-2"] = balance_sheet.loc['Accounts Receivable'].iloc[2]
-        data["Current Assets_t"] = balance_sheet.loc['Current Assets'].iloc[0]
-        data["Current Assets_t-1"] = balance_sheet.loc['Current Assets'].iloc[1]
-        data["Current Assets_t-2"] = balance_sheet.loc['Current Assets'].iloc[2]
-        data["Net PPE_t"] = balance_sheet.loc['Net PPE'].iloc[0]
-        data["Net PPE_t-1"] = balance_sheet.loc['Net PPE'].iloc[1]
-        data["Net PPE_t-2"] = balance_sheet.loc['Net PPE'].iloc[2]
-        data["Total Assets_t"] = balance_sheet.loc['Total Assets'].iloc[0]
-        data["Total Assets_t-1"] = balance_sheet.loc['Total Assets'].iloc[1]
-        data["Total Assets_t-2"] = balance_sheet.loc['Total Assets'].iloc[2]
-        data["Total Liabilities Net Minority Interest_t"] = balance_sheet.loc['Total Liabilities Net Minority Interest'].iloc[0]
-        data["Total Liabilities Net Minority Interest_t-1"] = balance_sheet.loc['Total Liabilities Net Minority Interest'].iloc[1]
-        data["Total Liabilities Net Minority Interest_t-2"] = balance_sheet.loc['Total Liabilities Net Minority Interest'].iloc[2]
-        
-        # Cash Flow Statement
-        data["Depreciation_t"] = cash_flow.loc['Depreciation And Amortization'].iloc[0]
-        data["Depreciation_t-1"] = cash_flow.loc['Depreciation And Amortization'].iloc[1]
-        data["Depreciation_t-2"] = cash_flow.loc['Depreciation And Amortization'].iloc[2]
-        data["Operating Cash Flow_t"] = cash_flow.loc['Operating Cash Flow'].iloc[0]
-        data["Operating Cash Flow_t-1"] = cash_flow.loc['Operating Cash Flow'].iloc[1]
-        data["Operating Cash Flow_t-2"] = cash_flow.loc['Operating Cash Flow'].iloc[2]
-        
-        return data
-    
+        with metrics.timer("extract"):
+            history = extract_history(*statements, ttm=quarterly)
+        if history.empty:
+            raise ValueError("no fiscal periods found in the financial statements")
+        if quarterly and len(history) <= TTM_LAG:
+            # Scoring compares each TTM window with the one TTM_LAG quarters earlier
+            if metrics.enabled:
+                metrics.incr("ttm_too_short")
+            logger.warning("%s: only %d consecutive quarters available, %d are needed for a quarterly score.",
+                           ticker, len(history) + 3, TTM_LAG + 4)
+
+        fallbacks = {item: how for item, how in history.attrs["provenance"].items() if how != "reported"}
+        if fallbacks:
+            logger.info("%s: line items not reported directly: %s", ticker,
+                        "; ".join(f"{item} ({how})" for item, how in fallbacks.items()))
+        return history
+
     except Exception as e:
-        print(f"Error fetching data for {ticker}: {e}")
-        print("This could be due to missing financial data or different naming conventions in the financial statements.")
+        if metrics.enabled:
+            metrics.incr("extract_failed")
+        logger.warning("Error fetching data for %s: %s. This could be due to missing financial data "
+                       "or different naming conventions in the financial statements.", ticker, e)
+        return None
+
+def fetch_financial_data(ticker, cache=None):
+    history = fetch_financial_history(ticker, cache=cache)
+    if history is None:
+        return None
+    if len(history) < 3:
+        logger.warning("Error fetching data for %s: only %d fiscal periods available, 3 are needed.", ticker, len(history))
         return None
 
+    # Current Year: t, Prior Year: t-1, Previous Year: t-2
+    data = {}
+    for suffix, (_, row) in zip(("t", "t-1", "t-2"), history.iloc[::-1].iterrows()):
+        for item in LINE_ITEMS:
+            data[f"{item}_{suffix}"] = row[item]
+    return data
+
+class TokenBucket:
+    """Thread-safe token bucket allowing `rate` acquisitions per second, in bursts of up to `capacity`"""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+def _fetch_with_retry(ticker, fetcher, bucket, retries, backoff):
+    for attempt in range(retries + 1):
+        if bucket is not None:
+            bucket.acquire()
+        try:
+            return fetcher(ticker)
+        except Exception:
+            if attempt == retries:
+                raise
+            if metrics.enabled:
+                metrics.incr("fetch_retry")
+            # Exponential backoff with jitter so workers don't retry in lockstep
+            time.sleep(backoff * 2 ** attempt * (1 + random.random()))
+
+def fetch_many(tickers, max_workers=8, rate_limit=5.0, retries=3, backoff=1.0, fetcher=None, bucket=None,
+               on_error=None):
+    """Fetch many tickers concurrently and yield (ticker, data) pairs as they finish.
+
+    `fetcher` defaults to fetch_financial_data; pass a stub to run offline, or
+    functools.partial(fetch_financial_data, cache=...) to go through a StatementCache.
+    `rate_limit` caps fetcher calls per second across all workers (None disables it);
+    pass a shared TokenBucket as `bucket` instead to cap several calls together.
+    Failed calls are retried with exponential backoff; a ticker that still fails
+    yields (ticker, None), like fetch_financial_data does for missing data, after
+    calling on_error(ticker, exception) if given.
+    Only a bounded number of tickers is in flight, so `tickers` may be a lazy iterator.
+    """
+    fetcher = fetcher or fetch_financial_data
+    if bucket is None and rate_limit:
+        bucket = TokenBucket(rate_limit)
+    tickers = iter(tickers)
+    max_in_flight = max_workers * 2
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = {}
+
+        def submit_next():
+            for ticker in tickers:
+                future = executor.submit(_fetch_with_retry, ticker, fetcher, bucket, retries, backoff)
+                pending[future] = ticker
+                return True
+            return False
+
+        while len(pending) < max_in_flight and submit_next():
+            pass
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                ticker = pending.pop(future)
+                try:
+                    data = future.result()
+                except Exception as e:
+                    if metrics.enabled:
+                        metrics.incr("fetch_failed")
+                    logger.warning("Error fetching data for %s: %s", ticker, e)
+                    if on_error is not None:
+                        on_error(ticker, e)
+                    data = None
+                submit_next()
+                yield ticker, data
+
 def safe_divide(numerator, denominator, default=1.0):
     """Safe division function to handle zero division errors"""
     if denominator == 0:
+        if metrics.enabled:
+            metrics.incr("safe_divide_default")
         return default
     return numerator / denominator
 
+@dataclass(slots=True)
+class StatementSnapshot:
+    """Line items of one fiscal period (one field per name in LINE_ITEMS, same order)"""
+    total_revenue: float
+    cost_of_revenue: float
+    selling_general_and_administration: float
+    net_income: float
+    accounts_receivable: float
+    current_assets: float
+    net_ppe: float
+    total_assets: float
+    total_liabilities: float
+    depreciation: float
+    operating_cash_flow: float
+
+    @classmethod
+    def from_data(cls, data, year_suffix):
+        """Read one period out of a fetch_financial_data dict, e.g. from_data(data, "t-1")"""
+        return cls(*(data[f"{item}_{year_suffix}"] for item in LINE_ITEMS))
+
+    def to_data(self, year_suffix):
+        return {f"{item}_{year_suffix}": getattr(self, name) for item, name in zip(LINE_ITEMS, _SNAPSHOT_FIELDS)}
+
+_SNAPSHOT_FIELDS = tuple(field.name for field in fields(StatementSnapshot))
+_SNAPSHOT_FIELD = dict(zip(LINE_ITEMS, _SNAPSHOT_FIELDS))
+
+def _missing_inputs(key, current, prior):
+    current_items, prior_items = COMPONENT_INPUTS[key]
+    return (any(getattr(current, _SNAPSHOT_FIELD[item]) != getattr(current, _SNAPSHOT_FIELD[item])
+                for item in current_items)
+            or any(getattr(prior, _SNAPSHOT_FIELD[item]) != getattr(prior, _SNAPSHOT_FIELD[item])
+                   for item in prior_items))
+
+@dataclass(slots=True)
+class MScoreResult:
+    """M-Score of one period with the eight indices as fields.
+
+    `weights` holds the coefficients the score was computed with.
+    """
+    m_score: float
+    DSRI: float
+    GMI: float
+    AQI: float
+    SGI: float
+    DEPI: float
+    SGAI: float
+    TATA: float
+    LVGI: float
+    weights: dict = field(repr=False)
+
+    @property
+    def components(self):
+        return {key: getattr(self, key) for key in COMPONENTS}
+
+    @property
+    def weighted_components(self):
+        return {key: self.weights[key] * getattr(self, key) for key in COMPONENTS}
+
+    @property
+    def manipulation_flag(self):
+        # None when an index couldn't be calculated
+        if self.m_score != self.m_score:
+            return None
+        return not self.m_score < M_SCORE_THRESHOLD
+
+    def as_tuple(self):
+        """(m_score, components, weighted_components), as returned by the dict API of calculate_m_score"""
+        return self.m_score, self.components, self.weighted_components
+
+def score_snapshots(current, prior):
+    """Calculate the M-Score of the `current` StatementSnapshot against the `prior` one"""
+    with metrics.timer("score"):
+        return _score_snapshots(current, prior, dict(coefficients))
+
+def _score_snapshots(current, prior, weights):
+    # Calculate the 8 ratios with safe division
+    DSRI = safe_divide(
+        safe_divide(current.accounts_receivable, current.total_revenue),
+        safe_divide(prior.accounts_receivable, prior.total_revenue)
+    )
+
+    # Gross Margin for current and previous periods
+    gm_t_minus_1 = safe_divide(prior.total_revenue - prior.cost_of_revenue, prior.total_revenue)
+    gm_t = safe_divide(current.total_revenue - current.cost_of_revenue, current.total_revenue)
+    GMI = safe_divide(gm_t_minus_1, gm_t)
+
+    # Asset Quality for current and previous periods
+    aqi_t = 1 - safe_divide(current.current_assets + current.net_ppe, current.total_assets)
+    aqi_t_minus_1 = 1 - safe_divide(prior.current_assets + prior.net_ppe, prior.total_assets)
+    AQI = safe_divide(aqi_t, aqi_t_minus_1)
+
+    # Sales Growth Index
+    SGI = safe_divide(current.total_revenue, prior.total_revenue)
+
+    # Depreciation Index
+    depi_t_minus_1 = safe_divide(prior.depreciation, prior.net_ppe + prior.depreciation)
+    depi_t = safe_divide(current.depreciation, current.net_ppe + current.depreciation)
+    DEPI = safe_divide(depi_t_minus_1, depi_t)
+
+    # SG&A Index
+    sgai_t = safe_divide(current.selling_general_and_administration, current.total_revenue)
+    sgai_t_minus_1 = safe_divide(prior.selling_general_and_administration, prior.total_revenue)
+    SGAI = safe_divide(sgai_t, sgai_t_minus_1)
+
+    # Total Accruals to Total Assets
+    TATA = safe_divide(current.net_income - current.operating_cash_flow, current.total_assets)
+
+    # Leverage Index
+    lvgi_t = safe_divide(current.total_liabilities, current.total_assets)
+    lvgi_t_minus_1 = safe_divide(prior.total_liabilities, prior.total_assets)
+    LVGI = safe_divide(lvgi_t, lvgi_t_minus_1)
+
+    values = [DSRI, GMI, AQI, SGI, DEPI, SGAI, TATA, LVGI]
+
+    # Check for NaN or infinity values and replace with 1.0 (neutral), unless they
+    # come from missing line items: those indices stay NaN and so does the M-Score
+    for i, (key, value) in enumerate(zip(COMPONENTS, values)):
+        if _missing_inputs(key, current, prior):
+            if metrics.enabled:
+                metrics.incr("component_incomplete", component=key)
+            logger.warning("%s can't be calculated: line items are missing.", key)
+            values[i] = float("nan")
+        elif value != value or value == float('inf') or value == float('-inf'):  # Check for NaN or infinity
+            if metrics.enabled:
+                metrics.incr("component_replaced", component=key)
+            logger.warning("%s calculation resulted in an invalid value. Using 1.0 instead.", key)
+            values[i] = 1.0
+
+    # Calculate M-Score
+    m_score = weights["Constant"]
+    for key, value in zip(COMPONENTS, values):
+        m_score += weights[key] * value
+
+    return MScoreResult(m_score, *values, weights)
+
 def calculate_m_score(data, year_suffix_t, year_suffix_t_minus_1):
+    """Calculate the M-Score of one period of a fetch_financial_data dict against the prior period.
+
+    Returns (m_score, components, weighted_components). Use score_snapshots to score
+    StatementSnapshot records directly.
+    """
     try:
-        # Calculate the 8 ratios for the given year suffixes with safe division
-        DSRI = safe_divide(
-            safe_divide(data[f'Accounts Receivable_{year_suffix_t}'], data[f'Total Revenue_{year_suffix_t}']),
-            safe_divide(data[f'Accounts Receivable_{year_suffix_t_minus_1}'], data[f'Total Revenue_{year_suffix_t_minus_1}'])
-        )
-        
-        # Gross Margin for current and previous periods
-        gm_t_minus_1 = safe_divide(data[f'Total Revenue_{year_suffix_t_minus_1}'] - data[f'Cost Of Revenue_{year_suffix_t_minus_1}'], 
-                                   data[f'Total Revenue_{year_suffix_t_minus_1}'])
-        gm_t = safe_divide(data[f'Total Revenue_{year_suffix_t}'] - data[f'Cost Of Revenue_{year_suffix_t}'], 
-                           data[f'Total Revenue_{year_suffix_t}'])
-        GMI = safe_divide(gm_t_minus_1, gm_t)
-        
-        # Asset Quality for current and previous periods
-        aqi_t = 1 - safe_divide(data[f'Current Assets_{year_suffix_t}'] + data[f'Net PPE_{year_suffix_t}'], 
-                              data[f'Total Assets_{year_suffix_t}'])
-        aqi_t_minus_1 = 1 - safe_divide(data[f'Current Assets_{year_suffix_t_minus_1}'] + data[f'Net PPE_{year_suffix_t_minus_1}'], 
-                                       data[f'Total Assets_{year_suffix_t_minus_1}'])
-        AQI = safe_divide(aqi_t, aqi_t_minus_1)
-        
-        # Sales Growth Index
-        SGI = safe_divide(data[f'Total Revenue_{year_suffix_t}'], data[f'Total Revenue_{year_suffix_t_minus_1}'])
-        
-        # Depreciation Index
-        depi_t_minus_1 = safe_divide(data[f'Depreciation_{year_suffix_t_minus_1}'], 
-                                    (data[f'Net PPE_{year_suffix_t_minus_1}'] + data[f'Depreciation_{year_suffix_t_minus_1}']))
-        depi_t = safe_divide(data[f'Depreciation_{year_suffix_t}'], 
-                           (data[f'Net PPE_{year_suffix_t}'] + data[f'Depreciation_{year_suffix_t}']))
-        DEPI = safe_divide(depi_t_minus_1, depi_t)
-        
-        # SG&A Index
-        sgai_t = safe_divide(data[f'Selling General And Administration_{year_suffix_t}'], data[f'Total Revenue_{year_suffix_t}'])
-        sgai_t_minus_1 = safe_divide(data[f'Selling General And Administration_{year_suffix_t_minus_1}'], 
-                                    data[f'Total Revenue_{year_suffix_t_minus_1}'])
-        SGAI = safe_divide(sgai_t, sgai_t_minus_1)
-        
-        # Total Accruals to Total Assets
-        TATA = safe_divide(data[f'Net Income_{year_suffix_t}'] - data[f'Operating Cash Flow_{year_suffix_t}'], 
-                         data[f'Total Assets_{year_suffix_t}'])
-        
-        # Leverage Index
-        lvgi_t = safe_divide(data[f'Total Liabilities Net Minority Interest_{year_suffix_t}'], data[f'Total Assets_{year_suffix_t}'])
-        lvgi_t_minus_1 = safe_divide(data[f'Total Liabilities Net Minority Interest_{year_suffix_t_minus_1}'], 
-                                   data[f'Total Assets_{year_suffix_t_minus_1}'])
-        LVGI = safe_divide(lvgi_t, lvgi_t_minus_1)
-        
-        # Collect individual components with their values
-        components = {
-            "DSRI": DSRI,
-            "GMI": GMI,
-            "AQI": AQI,
-            "SGI": SGI,
-            "DEPI": DEPI,
-            "SGAI": SGAI,
-            "TATA": TATA,
-            "LVGI": LVGI
-        }
-        
-        # Check for NaN or infinity values and replace with 1.0 (neutral)
-        for key, value in components.items():
-            if value != value or value == float('inf') or value == float('-inf'):  # Check for NaN or infinity
-                print(f"Warning: {key} calculation resulted in an invalid value. Using 1.0 instead.")
-                components[key] = 1.0
-        
-        # Calculate weighted components
-        weighted_components = {}
-        for key, value in components.items():
-            weighted_components[key] = coefficients[key] * value
-        
-        # Calculate M-Score
-        m_score = coefficients["Constant"]
-        for key, value in weighted_components.items():
-            m_score += value
-        
-        return m_score, components, weighted_components
+        current = StatementSnapshot.from_data(data, year_suffix_t)
+        prior = StatementSnapshot.from_data(data, year_suffix_t_minus_1)
+        return score_snapshots(current, prior).as_tuple()
     
     except Exception as e:
-        print(f"Error calculating M-Score: {e}")
+        if metrics.enabled:
+            metrics.incr("score_failed")
+        logger.warning("Error calculating M-Score: %s", e)
         # Return default values
-        default_components = {k: 1.0 for k in ["DSRI", "GMI", "AQI", "SGI", "DEPI", "SGAI", "TATA", "LVGI"]}
+        default_components = {k: 1.0 for k in COMPONENTS}
         default_weighted = {k: coefficients[k] for k in default_components}
         return coefficients["Constant"] + sum(default_weighted.values()), default_components, default_weighted
 
-def interpret_m_score(m_score, components):
+def safe_divide_array(numerator, denominator, default=1.0):
+    """Vectorized safe_divide: zero denominators are masked to the default"""
+    import numpy as np
+
+    zero = denominator == 0
+    if metrics.enabled:
+        metrics.incr("safe_divide_default", int(np.count_nonzero(zero)))
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        result = numerator / np.where(zero, 1.0, denominator)
+    return np.where(zero, default, result)
+
+def m_score_arrays(current, prior):
+    """Compute the M-Score from line-item arrays for periods t (current) and t-1 (prior).
+
+    Both arguments map each name in LINE_ITEMS to an array; every array position is
+    scored independently with the same rules as calculate_m_score.
+    Returns (m_score, components, weighted_components) with arrays in place of floats.
+    """
+    import numpy as np
+
+    cur = {item: np.asarray(current[item], dtype=float) for item in LINE_ITEMS}
+    pri = {item: np.asarray(prior[item], dtype=float) for item in LINE_ITEMS}
+
+    DSRI = safe_divide_array(
+        safe_divide_array(cur['Accounts Receivable'], cur['Total Revenue']),
+        safe_divide_array(pri['Accounts Receivable'], pri['Total Revenue'])
+    )
+
+    gm_t_minus_1 = safe_divide_array(pri['Total Revenue'] - pri['Cost Of Revenue'], pri['Total Revenue'])
+    gm_t = safe_divide_array(cur['Total Revenue'] - cur['Cost Of Revenue'], cur['Total Revenue'])
+    GMI = safe_divide_array(gm_t_minus_1, gm_t)
+
+    aqi_t = 1 - safe_divide_array(cur['Current Assets'] + cur['Net PPE'], cur['Total Assets'])
+    aqi_t_minus_1 = 1 - safe_divide_array(pri['Current Assets'] + pri['Net PPE'], pri['Total Assets'])
+    AQI = safe_divide_array(aqi_t, aqi_t_minus_1)
+
+    SGI = safe_divide_array(cur['Total Revenue'], pri['Total Revenue'])
+
+    depi_t_minus_1 = safe_divide_array(pri['Depreciation'], pri['Net PPE'] + pri['Depreciation'])
+    depi_t = safe_divide_array(cur['Depreciation'], cur['Net PPE'] + cur['Depreciation'])
+    DEPI = safe_divide_array(depi_t_minus_1, depi_t)
+
+    sgai_t = safe_divide_array(cur['Selling General And Administration'], cur['Total Revenue'])
+    sgai_t_minus_1 = safe_divide_array(pri['Selling General And Administration'], pri['Total Revenue'])
+    SGAI = safe_divide_array(sgai_t, sgai_t_minus_1)
+
+    TATA = safe_divide_array(cur['Net Income'] - cur['Operating Cash Flow'], cur['Total Assets'])
+
+    lvgi_t = safe_divide_array(cur['Total Liabilities Net Minority Interest'], cur['Total Assets'])
+    lvgi_t_minus_1 = safe_divide_array(pri['Total Liabilities Net Minority Interest'], pri['Total Assets'])
+    LVGI = safe_divide_array(lvgi_t, lvgi_t_minus_1)
+
+    components = {
+        "DSRI": DSRI,
+        "GMI": GMI,
+        "AQI": AQI,
+        "SGI": SGI,
+        "DEPI": DEPI,
+        "SGAI": SGAI,
+        "TATA": TATA,
+        "LVGI": LVGI
+    }
+
+    # Replace NaN or infinity values with 1.0 (neutral), except where a line item the
+    # index reads is missing: those stay NaN, and so does the M-Score
+    for key, value in components.items():
+        current_items, prior_items = COMPONENT_INPUTS[key]
+        incomplete = np.zeros(np.shape(value), dtype=bool)
+        for item in current_items:
+            incomplete |= np.isnan(cur[item])
+        for item in prior_items:
+            incomplete |= np.isnan(pri[item])
+        finite = np.isfinite(value)
+        if metrics.enabled:
+            metrics.incr("component_replaced", int(np.count_nonzero(~finite & ~incomplete)), component=key)
+            metrics.incr("component_incomplete", int(np.count_nonzero(incomplete)), component=key)
+        components[key] = np.where(incomplete, np.nan, np.where(finite, value, 1.0))
+
+    weighted_components = {key: coefficients[key] * value for key, value in components.items()}
+
+    m_score = np.full(np.shape(DSRI), coefficients["Constant"])
+    for value in weighted_components.values():
+        m_score = m_score + value
+
+    return m_score, components, weighted_components
+
+def calculate_m_scores_batch(panel, lag=1):
+    """Score every period of every ticker in a panel against the ticker's previous period.
+
+    `panel` is a DataFrame indexed by (ticker, period) with one column per name in
+    LINE_ITEMS. Rows of each ticker must be ordered from oldest to newest period.
+    The first `lag` periods of each ticker have nothing to compare against and are
+    left out; pass lag=TTM_LAG for quarterly TTM histories.
+
+    Returns a DataFrame indexed like the scored rows with the eight indices, their
+    weighted values (suffix "_weighted"), "M-Score" and "Manipulation Flag". Rows
+    missing a line item an index needs are incomplete: that index and the M-Score
+    are NaN and the flag is NA.
+    """
+    with metrics.timer("score_batch"):
+        index, current, prior = pair_periods(panel, lag)
+        m_score, components, weighted_components = m_score_arrays(
+            {item: current[:, i] for i, item in enumerate(LINE_ITEMS)},
+            {item: prior[:, i] for i, item in enumerate(LINE_ITEMS)},
+        )
+        return scores_frame(index, m_score, components, weighted_components)
+
+def pair_periods(panel, lag=1):
+    """Pair each panel row with the row `lag` rows earlier of the same ticker.
+
+    Returns (index, current, prior): the index of the rows that have a prior period
+    and two float arrays of shape (rows, len(LINE_ITEMS)) holding their line items.
+    """
+    values = panel.loc[:, list(LINE_ITEMS)].astype(float)
+    tickers = panel.index.get_level_values(0)
+
+    prior_values = values.groupby(tickers, sort=False).shift(lag)
+    has_prior = (values.groupby(tickers, sort=False).cumcount() >= lag).to_numpy()
+    return panel.index[has_prior], values.to_numpy()[has_prior], prior_values.to_numpy()[has_prior]
+
+def scores_frame(index, m_score, components, weighted_components):
+    """Lay out m_score_arrays output as the DataFrame returned by calculate_m_scores_batch"""
+    import pandas as pd
+
+    result = pd.DataFrame(components, index=index)
+    for key, value in weighted_components.items():
+        result[f"{key}_weighted"] = value
+    result["M-Score"] = m_score
+    result["Manipulation Flag"] = manipulation_flags(m_score)
+    return result
+
+def manipulation_flags(m_score):
+    """Nullable boolean flags for an array of M-Scores: NA where the score is incomplete (NaN)"""
+    import numpy as np
+    import pandas as pd
+
+    m_score = np.asarray(m_score, dtype=float)
+    return pd.arrays.BooleanArray(~(m_score < M_SCORE_THRESHOLD), np.isnan(m_score))
+
+def panel_from_data(records):
+    """Build a calculate_m_scores_batch panel from {ticker: data dict} as returned by fetch_financial_data"""
+    import pandas as pd
+
+    periods = ("t-2", "t-1", "t")
+    rows = [
+        [data[f"{item}_{period}"] for item in LINE_ITEMS]
+        for data in records.values() for period in periods
+    ]
+    index = pd.MultiIndex.from_tuples(
+        [(ticker, period) for ticker in records for period in periods],
+        names=["ticker", "period"],
+    )
+    return pd.DataFrame(rows, index=index, columns=list(LINE_ITEMS), dtype=float)
+
+def panel_from_history(histories):
+    """Build a calculate_m_scores_batch panel from {ticker: history} as returned by fetch_financial_history"""
+    import pandas as pd
+
+    return pd.concat(histories, names=["ticker", "period"])
+
+def interpret_m_score(m_score, components=None):
+    # Accept an MScoreResult in place of (m_score, components)
+    if isinstance(m_score, MScoreResult):
+        m_score, components = m_score.m_score, m_score.components
+
     result = {}
     
     # Overall interpretation
-    if m_score < -1.78:
+    if m_score != m_score:
+        result["overall"] = "Incomplete - line items needed for the M-Score are missing."
+    elif m_score < M_SCORE_THRESHOLD:
         result["overall"] = "Low probability of earnings manipulation."
     else:
         result["overall"] = "High probability of earnings manipulation."
@@ -179,56 +783,66 @@ def interpret_m_score(m_score, components):
     result["components"] = {}
     
     # DSRI - Days Sales in Receivables Index
-    if components["DSRI"] > 1.031:
+    if components["DSRI"] > COMPONENT_THRESHOLDS["DSRI"]:
         result["components"]["DSRI"] = "High - Possible inflated revenues"
     else:
         result["components"]["DSRI"] = "Normal"
     
     # GMI - Gross Margin Index
-    if components["GMI"] > 1.193:
+    if components["GMI"] > COMPONENT_THRESHOLDS["GMI"]:
         result["components"]["GMI"] = "High - Deteriorating margins, negative signal"
     else:
         result["components"]["GMI"] = "Normal"
     
     # AQI - Asset Quality Index
-    if components["AQI"] > 1.254:
+    if components["AQI"] > COMPONENT_THRESHOLDS["AQI"]:
         result["components"]["AQI"] = "High - Possible capitalization of expenses"
     else:
         result["components"]["AQI"] = "Normal"
     
     # SGI - Sales Growth Index
-    if components["SGI"] > 1.607:
+    if components["SGI"] > COMPONENT_THRESHOLDS["SGI"]:
         result["components"]["SGI"] = "High - Unusual sales growth, pressure to manipulate"
     else:
         result["components"]["SGI"] = "Normal"
     
     # DEPI - Depreciation Index
-    if components["DEPI"] > 1.077:
+    if components["DEPI"] > COMPONENT_THRESHOLDS["DEPI"]:
         result["components"]["DEPI"] = "High - Possible slowing of depreciation rates"
     else:
         result["components"]["DEPI"] = "Normal"
     
     # SGAI - SG&A Index
-    if components["SGAI"] > 1.041:
+    if components["SGAI"] > COMPONENT_THRESHOLDS["SGAI"]:
         result["components"]["SGAI"] = "High - Loss of cost control"
     else:
         result["components"]["SGAI"] = "Normal"
     
     # TATA - Total Accruals to Total Assets
-    if components["TATA"] > 0.018:
+    if components["TATA"] > COMPONENT_THRESHOLDS["TATA"]:
         result["components"]["TATA"] = "High - Possible earnings manipulation through accruals"
     else:
         result["components"]["TATA"] = "Normal"
     
     # LVGI - Leverage Index
-    if components["LVGI"] > 1.111:
+    if components["LVGI"] > COMPONENT_THRESHOLDS["LVGI"]:
         result["components"]["LVGI"] = "High - Increased leverage, potential manipulation to meet debt covenants"
     else:
         result["components"]["LVGI"] = "Normal"
+
+    for key, value in components.items():
+        if value != value:
+            result["components"][key] = "Incomplete - line items are missing"
     
     return result
 
-def print_report(period_label, ticker, m_score, components, weighted_components, interpretation):
+def print_report(period_label, ticker, m_score, components=None, weighted_components=None, interpretation=None):
+    # Accept an MScoreResult in place of (m_score, components, weighted_components)
+    if isinstance(m_score, MScoreResult):
+        m_score, components, weighted_components = m_score.as_tuple()
+    if interpretation is None:
+        interpretation = interpret_m_score(m_score, components)
+
     print("\n" + "="*60)
     print(f"BENEISH M-SCORE ANALYSIS FOR {ticker} - {period_label}")
     print("="*60)
@@ -292,41 +906,51 @@ def print_comparison(current_year, prior_year, current_m_score, prior_m_score,
     print(f"Change: {change_str}")
     print(f"The M-Score has {change_str.lower()}, indicating a {change_interpretation} likelihood of earnings manipulation in the current period.")
     
-def main():
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if argv:
+        return run_cli(argv)
+
+    # Show progress and warnings on the console for interactive use
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+
     # Allow user to select a ticker
     default_ticker = "NVDA"
     user_ticker = input(f"Enter ticker symbol (default: {default_ticker}): ").strip().upper()
     ticker = user_ticker if user_ticker else default_ticker
     
-    # Fetch data
-    data = fetch_financial_data(ticker)
+    # Fetch every fiscal period and score each consecutive pair
+    history = fetch_financial_history(ticker)
     
-    if data:
+    if history is not None and len(history) >= 2:
         try:
-            # Calculate M-Score for current period (t vs t-1)
-            current_m_score, current_components, current_weighted = calculate_m_score(data, "t", "t-1")
-            current_interpretation = interpret_m_score(current_m_score, current_components)
+            scores = calculate_m_scores_batch(panel_from_history({ticker: history}))
             
-            # Calculate M-Score for prior period (t-1 vs t-2)
-            prior_m_score, prior_components, prior_weighted = calculate_m_score(data, "t-1", "t-2")
-            prior_interpretation = interpret_m_score(prior_m_score, prior_components)
+            # Newest period first, labelled with the real period-end date
+            reports = []
+            for (_, period), row in scores.iloc[::-1].iterrows():
+                m_score = row["M-Score"]
+                components = {key: row[key] for key in COMPONENTS}
+                weighted = {key: row[f"{key}_weighted"] for key in COMPONENTS}
+                interpretation = interpret_m_score(m_score, components)
+                reports.append((f"Fiscal Period Ending {period:%Y-%m-%d}", m_score, components, weighted, interpretation))
             
-            # Get the actual years from the data (if available, otherwise use generic labels)
-            try:
-                current_year = f"Current Period"
-                prior_year = f"Prior Period"
-            except:
-                current_year = "Current Period"
-                prior_year = "Prior Period"
+            # Print year-over-year comparison when both scores are complete
+            if len(reports) >= 2 and all(report[1] == report[1] for report in reports[:2]):
+                (current_year, current_m_score, current_components, current_weighted, _), \
+                    (prior_year, prior_m_score, prior_components, prior_weighted, _) = reports[:2]
+                print_comparison(current_year, prior_year, current_m_score, prior_m_score, 
+                                current_components, prior_components, 
+                                current_weighted, prior_weighted)
             
-            # Print year-over-year comparison
-            print_comparison(current_year, prior_year, current_m_score, prior_m_score, 
-                            current_components, prior_components, 
-                            current_weighted, prior_weighted)   
-    
-            # Print detailed reports for both periods
-            print_report(current_year, ticker, current_m_score, current_components, current_weighted, current_interpretation)
-            print_report(prior_year, ticker, prior_m_score, prior_components, prior_weighted, prior_interpretation)
+            # Print detailed reports for every period
+            for period_label, m_score, components, weighted, interpretation in reports:
+                if m_score != m_score:
+                    missing = [key for key, value in components.items() if value != value]
+                    print(f"\n{period_label}: incomplete data for {ticker}, "
+                          f"{', '.join(missing)} can't be calculated, so no M-Score is reported.")
+                    continue
+                print_report(period_label, ticker, m_score, components, weighted, interpretation)
             
         except Exception as e:
             print(f"Error during analysis: {e}")
@@ -335,6 +959,39 @@ def main():
         print(f"Unable to calculate Beneish M-Score for {ticker} due to insufficient data. This problem is especially present for Banks.")
         print("Try another ticker or check if the company has complete financial statements available.")
 
+def run_cli(argv):
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="beneish", description="Beneish M-Score calculator")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    screen_parser = commands.add_parser("screen", help="Score a list of tickers non-interactively")
+    screen_parser.add_argument("--input", required=True, help="Text file with one ticker per line")
+    screen_parser.add_argument("--output", required=True, help="Results file (.csv, .jsonl or .parquet)")
+    screen_parser.add_argument("--chunk-size", type=int, default=500, help="Tickers written per flush")
+    screen_parser.add_argument("--workers", type=int, default=8, help="Concurrent fetches")
+    screen_parser.add_argument("--rate-limit", type=float, default=5.0, help="Fetches per second")
+    screen_parser.add_argument("--quarterly", action="store_true",
+                               help="Score trailing-twelve-month windows from quarterly statements")
+    screen_parser.add_argument("--metrics-json", help="Write stage timings and counters to this JSON file")
+    screen_parser.add_argument("--metrics-prom", help="Write stage timings and counters in Prometheus text format")
+    screen_parser.add_argument("--profile", help="Write cProfile stats for the run to this file")
+    screen_parser.add_argument("-v", "--verbose", action="store_true", help="Log per-ticker progress and warnings")
+
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO if args.verbose else logging.WARNING, format="%(levelname)s %(message)s")
+    if args.command == "screen":
+        from screener import screen
+        if args.metrics_json or args.metrics_prom:
+            metrics.enable()
+        with metrics.profile(args.profile) if args.profile else contextlib.nullcontext():
+            screen(args.input, args.output, chunk_size=args.chunk_size,
+                   max_workers=args.workers, rate_limit=args.rate_limit, quarterly=args.quarterly)
+        if args.metrics_json:
+            metrics.export_json(args.metrics_json)
+        if args.metrics_prom:
+            metrics.export_prometheus(args.metrics_prom)
+
 if __name__ == "__main__":
     main()
 
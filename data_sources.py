@@ -0,0 +1,214 @@
+import json
+import os
+
+import pandas as pd
+
+from beneish import LINE_ITEMS, TTM_LAG, calculate_m_scores_batch, fetch_financial_history, panel_from_history
+
+# US-GAAP XBRL tags for each line item, most preferred first
+XBRL_TAGS = {
+    "Total Revenue": ["Revenues", "RevenueFromContractWithCustomerExcludingAssessedTax", "SalesRevenueNet"],
+    "Cost Of Revenue": ["CostOfRevenue", "CostOfGoodsAndServicesSold", "CostOfGoodsSold"],
+    "Selling General And Administration": ["SellingGeneralAndAdministrativeExpense"],
+    "Net Income": ["NetIncomeLoss", "ProfitLoss"],
+    "Accounts Receivable": ["AccountsReceivableNetCurrent", "ReceivablesNetCurrent"],
+    "Current Assets": ["AssetsCurrent"],
+    "Net PPE": ["PropertyPlantAndEquipmentNet"],
+    "Total Assets": ["Assets"],
+    "Total Liabilities Net Minority Interest": ["Liabilities"],
+    "Depreciation": ["DepreciationDepletionAndAmortization", "DepreciationAndAmortization", "Depreciation"],
+    "Operating Cash Flow": ["NetCashProvidedByUsedInOperatingActivities"],
+}
+
+# Balance sheet items are instants; everything else covers the fiscal year
+INSTANT_ITEMS = {"Accounts Receivable", "Current Assets", "Net PPE", "Total Assets",
+                 "Total Liabilities Net Minority Interest"}
+
+
+# tag -> line item and tag -> preference; line item names map to themselves for our own exports
+TAG_ITEMS = {item: item for item in LINE_ITEMS}
+TAG_PRIORITY = {item: 0 for item in LINE_ITEMS}
+for _item, _tags in XBRL_TAGS.items():
+    for _priority, _tag in enumerate(_tags):
+        TAG_ITEMS[_tag] = _item
+        TAG_PRIORITY[_tag] = _priority
+
+
+class DataSource:
+    """Where statement histories come from.
+
+    history(ticker) returns a period x line item frame like extract_history, oldest
+    period first, or None. panel(tickers) returns a calculate_m_scores_batch panel;
+    sources that hold many tickers at once should override it, and only those
+    accept tickers=None to mean everything they hold. Such sources set holds_panel,
+    so callers can take one panel() instead of a history() per ticker.
+    """
+
+    holds_panel = False
+
+    def history(self, ticker, quarterly=False):
+        raise NotImplementedError
+
+    def panel(self, tickers, quarterly=False):
+        if tickers is None:
+            raise ValueError(f"{type(self).__name__} can't list its tickers; pass the tickers to score")
+        histories = {}
+        for ticker in tickers:
+            history = self.history(ticker, quarterly)
+            if history is not None:
+                histories[ticker] = history
+        return panel_from_history(histories)
+
+    def scores(self, tickers=None, quarterly=False):
+        return calculate_m_scores_batch(self.panel(tickers, quarterly), lag=TTM_LAG if quarterly else 1)
+
+
+class YFinanceSource(DataSource):
+    """Statements fetched from Yahoo Finance, optionally through a StatementCache"""
+
+    def __init__(self, cache=None):
+        self.cache = cache
+
+    def history(self, ticker, quarterly=False):
+        return fetch_financial_history(ticker, quarterly, self.cache)
+
+
+class BulkFileSource(DataSource):
+    """Statements loaded from bulk files on local disk.
+
+    `path` is one of, or a list of:
+    - a SEC Financial Statement Data Sets quarter directory (sub.txt and num.txt)
+    - a Parquet or CSV file of facts in long format (ticker, period, tag, value),
+      where tag is an XBRL tag from XBRL_TAGS or a LINE_ITEMS name
+    - a Parquet or CSV file in wide format (ticker, period and one column per
+      LINE_ITEMS name)
+
+    Only the needed columns are read (and Parquet is memory-mapped). Facts are
+    reduced to the model's line items with vectorized filters and one pivot over
+    the whole universe, so no per-ticker frames are built; wide files are indexed
+    as they are. When files overlap, the first value found for a line item wins.
+    SEC data is keyed by CIK unless `ticker_map` (a {cik: ticker} dict or SEC's
+    company_tickers.json) is given. Only annual (10-K) periods are supported.
+    """
+
+    holds_panel = True
+
+    def __init__(self, path, ticker_map=None):
+        self.paths = [path] if isinstance(path, (str, os.PathLike)) else list(path)
+        self.ticker_map = _load_ticker_map(ticker_map)
+        self._panel = None
+
+    def load(self):
+        """Read every file once and return the full panel"""
+        if self._panel is None:
+            panels, facts = [], []
+            for path in self.paths:
+                wide, long = self._read(path)
+                if wide is not None:
+                    panels.append(wide)
+                else:
+                    facts.append(long)
+            if facts:
+                panels.append(_facts_to_panel(pd.concat(facts, ignore_index=True)))
+            panel = pd.concat(panels) if len(panels) > 1 else panels[0]
+            if not panel.index.is_unique:
+                panel = panel.groupby(level=["ticker", "period"]).first()
+            self._panel = panel.sort_index()
+        return self._panel
+
+    def _read(self, path):
+        """Return (panel, None) for a wide file, or (None, facts) for long-format facts"""
+        if os.path.isdir(path):
+            return None, _read_sec_dataset(path, self.ticker_map)
+        if str(path).endswith(".parquet"):
+            if set(LINE_ITEMS) <= set(_parquet_columns(path)):
+                wide = pd.read_parquet(path, columns=["ticker", "period", *LINE_ITEMS], memory_map=True)
+                return _wide_to_panel(wide), None
+            return None, pd.read_parquet(path, columns=["ticker", "period", "tag", "value"], memory_map=True)
+
+        columns = pd.read_csv(path, nrows=0).columns
+        if set(LINE_ITEMS) <= set(columns):
+            return _wide_to_panel(pd.read_csv(path, usecols=["ticker", "period", *LINE_ITEMS])), None
+        return None, pd.read_csv(path, usecols=["ticker", "period", "tag", "value"], engine="pyarrow")
+
+    def panel(self, tickers=None, quarterly=False):
+        if quarterly:
+            # Only facts covering four quarters are loaded, so no TTM windows can be built
+            raise ValueError("BulkFileSource holds annual (10-K) periods only; "
+                             "use YFinanceSource for quarterly scores")
+        panel = self.load()
+        if tickers is None:
+            return panel
+        return panel[panel.index.get_level_values("ticker").isin(list(tickers))]
+
+    def history(self, ticker, quarterly=False):
+        panel = self.panel([ticker], quarterly)
+        if panel.empty:
+            return None
+        return panel.droplevel("ticker")
+
+
+def _parquet_columns(path):
+    import pyarrow.parquet as pq
+    return pq.read_schema(path).names
+
+
+def _load_ticker_map(ticker_map):
+    if ticker_map is None or isinstance(ticker_map, dict):
+        return ticker_map
+    # SEC company_tickers.json: {"0": {"cik_str": 320193, "ticker": "AAPL", "title": ...}, ...}
+    with open(ticker_map) as f:
+        return {int(entry["cik_str"]): entry["ticker"] for entry in json.load(f).values()}
+
+
+def _wide_to_panel(wide):
+    panel = wide.assign(period=pd.to_datetime(wide["period"])).set_index(["ticker", "period"])
+    # Rows without a single value would not survive the pivot of long facts either
+    return panel.reindex(columns=list(LINE_ITEMS)).astype(float).dropna(how="all")
+
+
+def _read_sec_dataset(directory, ticker_map):
+    # sub.txt: one row per filing; num.txt: one row per reported fact
+    sub = pd.read_csv(os.path.join(directory, "sub.txt"), sep="\t",
+                      usecols=["adsh", "cik", "form", "filed"], engine="pyarrow")
+    sub = sub[sub["form"].isin(["10-K", "10-K/A"])]
+
+    num = pd.read_csv(os.path.join(directory, "num.txt"), sep="\t",
+                      usecols=["adsh", "tag", "ddate", "qtrs", "uom", "coreg", "value"], engine="pyarrow")
+    # Tags repeat heavily, so map the distinct categories rather than every row
+    num["tag"] = num["tag"].astype("category")
+    items = num["tag"].map(TAG_ITEMS).astype(object)
+    instant = items.isin(INSTANT_ITEMS)
+    # Consolidated USD facts only: instants for the balance sheet, four quarters for flows
+    keep = (items.notna() & (num["uom"] == "USD") & num["coreg"].isna()
+            & ((instant & (num["qtrs"] == 0)) | (~instant & (num["qtrs"] == 4))))
+    num = num[keep]
+
+    facts = num.merge(sub, on="adsh")
+    if ticker_map is not None:
+        facts["ticker"] = facts["cik"].map(ticker_map)
+        facts = facts[facts["ticker"].notna()]
+    else:
+        facts["ticker"] = facts["cik"].astype(str)
+    ddate = facts["ddate"].astype("int64")
+    facts["period"] = pd.to_datetime({"year": ddate // 10000, "month": ddate // 100 % 100, "day": ddate % 100})
+
+    # A fact restated in a later filing replaces the original
+    facts = facts.sort_values("filed").drop_duplicates(["ticker", "period", "tag"], keep="last")
+    return facts[["ticker", "period", "tag", "value"]]
+
+
+def _facts_to_panel(facts):
+    tags = facts["tag"].astype("category")
+    facts = facts.assign(
+        item=tags.map(TAG_ITEMS).astype(object),
+        priority=tags.map(TAG_PRIORITY).astype(float),
+        period=pd.to_datetime(facts["period"]),
+    ).dropna(subset=["item"])
+
+    # Keep the most preferred tag reported for each line item
+    facts = facts.sort_values("priority").drop_duplicates(["ticker", "period", "item"], keep="first")
+    panel = facts.pivot(index=["ticker", "period"], columns="item", values="value")
+    panel = panel.reindex(columns=list(LINE_ITEMS)).astype(float).sort_index()
+    panel.columns.name = None
+    return panel
@@ -0,0 +1,171 @@
+"""Stage timers, fallback counters and profiling hooks for the scoring pipeline.
+
+Instrumentation is off by default. While disabled, timer() hands back a shared
+no-op context manager and callers guard incr() with `if metrics.enabled:`, so the
+hot path pays a single attribute check.
+
+    import metrics
+    metrics.enable()
+    ...
+    metrics.export_prometheus("beneish.prom")   # node_exporter textfile format
+    metrics.export_json("beneish_metrics.json")
+"""
+
+import contextlib
+import json
+import os
+import re
+import threading
+import time
+
+enabled = False
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_timers = {}  # stage -> [count, total seconds, max seconds]
+_trace_hooks = []
+
+_NULL_TIMER = contextlib.nullcontext()
+
+
+def enable(on=True):
+    global enabled
+    enabled = on
+
+
+def disable():
+    enable(False)
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _timers.clear()
+
+
+def incr(name, value=1, **labels):
+    """Add value to a counter, e.g. incr("component_replaced", component="DSRI")"""
+    key = (name, tuple(sorted(labels.items())))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + value
+
+
+def observe(stage, seconds):
+    """Record one timing for a stage and pass it on to any trace hooks"""
+    with _lock:
+        entry = _timers.get(stage)
+        if entry is None:
+            _timers[stage] = [1, seconds, seconds]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+            entry[2] = max(entry[2], seconds)
+    for hook in _trace_hooks:
+        hook(stage, seconds)
+
+
+class _Timer:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        observe(self.stage, time.perf_counter() - self.start)
+        return False
+
+
+def timer(stage):
+    """Context manager timing one stage; a shared no-op when instrumentation is disabled"""
+    return _Timer(stage) if enabled else _NULL_TIMER
+
+
+def add_trace_hook(hook):
+    """Call hook(stage, seconds) after every timed stage (e.g. to forward spans to a tracer)"""
+    _trace_hooks.append(hook)
+
+
+def remove_trace_hook(hook):
+    _trace_hooks.remove(hook)
+
+
+@contextlib.contextmanager
+def profile(path=None, sort="cumulative", limit=30):
+    """Run the enclosed block under cProfile, dumping stats to path or printing the top entries"""
+    import cProfile
+    import pstats
+
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        if path:
+            profiler.dump_stats(path)
+        else:
+            pstats.Stats(profiler).sort_stats(sort).print_stats(limit)
+
+
+def snapshot():
+    """Return the current counters and timers as plain data"""
+    with _lock:
+        counters = [
+            {"name": name, "labels": dict(labels), "value": value}
+            for (name, labels), value in sorted(_counters.items())
+        ]
+        timers = {
+            stage: {"count": count, "seconds": total, "max_seconds": longest}
+            for stage, (count, total, longest) in sorted(_timers.items())
+        }
+    return {"counters": counters, "timers": timers}
+
+
+def _write(path, text):
+    # Write then rename so scrapers never see a half-written file
+    with open(path + ".tmp", "w") as f:
+        f.write(text)
+    os.replace(path + ".tmp", path)
+
+
+def export_json(path):
+    _write(path, json.dumps(snapshot(), indent=2))
+
+
+def _metric_name(name):
+    return "beneish_" + re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{key}="{value}"' for key, value in sorted(labels.items()))
+    return "{" + pairs + "}"
+
+
+def export_prometheus(path):
+    """Write counters and timers in the Prometheus text exposition format"""
+    data = snapshot()
+    lines = []
+    declared = set()
+    for counter in data["counters"]:
+        name = _metric_name(counter["name"]) + "_total"
+        if name not in declared:
+            lines.append(f"# TYPE {name} counter")
+            declared.add(name)
+        lines.append(f"{name}{_labels(counter['labels'])} {counter['value']}")
+
+    if data["timers"]:
+        lines.append("# TYPE beneish_stage_seconds summary")
+        for stage, timing in data["timers"].items():
+            labels = _labels({"stage": stage})
+            lines.append(f"beneish_stage_seconds_count{labels} {timing['count']}")
+            lines.append(f"beneish_stage_seconds_sum{labels} {timing['seconds']:.6f}")
+        lines.append("# TYPE beneish_stage_seconds_max gauge")
+        for stage, timing in data["timers"].items():
+            lines.append(f"beneish_stage_seconds_max{_labels({'stage': stage})} {timing['max_seconds']:.6f}")
+    _write(path, "\n".join(lines) + "\n")
@@ -0,0 +1,95 @@
+import datetime
+import os
+import uuid
+
+import pandas as pd
+
+from beneish import COMPONENT_THRESHOLDS, COMPONENTS
+
+PARTITION_COLUMNS = ["run_date", "fiscal_year"]
+
+
+class ResultsStore:
+    """History of scoring runs as a partitioned Parquet dataset.
+
+    Every append() writes one file per (run_date, fiscal_year) partition under
+    <root>/run_date=YYYY-MM-DD/fiscal_year=YYYY/, holding the indices, weighted
+    components, M-Score and a "<index>_flag" column (True when the index is above
+    its COMPONENT_THRESHOLDS value, i.e. "High"; NA when it couldn't be calculated)
+    and a "run_at" UTC timestamp that orders runs sharing a run_date.
+    Queries read only the requested
+    columns and push filters down to partitions and Parquet row groups, so they
+    stay fast as nightly runs accumulate.
+    """
+
+    def __init__(self, root="results"):
+        self.root = root
+
+    def append(self, scores, run_date=None):
+        """Store a calculate_m_scores_batch frame as one run; returns the number of rows written"""
+        if scores.empty:
+            return 0
+        run_date = run_date or datetime.date.today()
+        rows = scores.reset_index()
+        rows["period"] = pd.to_datetime(rows["period"])
+        for key in COMPONENTS:
+            rows[f"{key}_flag"] = (rows[key] > COMPONENT_THRESHOLDS[key]).astype("boolean").mask(rows[key].isna())
+        rows["run_date"] = str(run_date)
+        rows["run_at"] = pd.Timestamp.now(tz="UTC")
+        rows["fiscal_year"] = rows["period"].dt.year
+
+        os.makedirs(self.root, exist_ok=True)
+        rows.to_parquet(self.root, partition_cols=PARTITION_COLUMNS, index=False,
+                        basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet")
+        return len(rows)
+
+    def query(self, columns=None, filters=None):
+        """Read matching rows; `filters` use pyarrow syntax, e.g. [("ticker", "==", "AAPL")]"""
+        if not os.path.isdir(self.root):
+            return pd.DataFrame(columns=columns)
+        result = pd.read_parquet(self.root, columns=columns, filters=filters)
+        # Partition values come back as categoricals
+        if "run_date" in result:
+            result["run_date"] = result["run_date"].astype(str)
+        if "fiscal_year" in result:
+            result["fiscal_year"] = result["fiscal_year"].astype(int)
+        return result
+
+    def run_dates(self):
+        if not os.path.isdir(self.root):
+            return []
+        return sorted(name.split("=", 1)[1] for name in os.listdir(self.root) if name.startswith("run_date="))
+
+    def _latest_per_period(self, rows):
+        # A fiscal period is scored again in every run; the latest run wins
+        rows = rows.sort_values(["ticker", "period", "run_date", "run_at"])
+        return rows.drop_duplicates(["ticker", "period"], keep="last").reset_index(drop=True)
+
+    def trajectory(self, ticker, columns=("M-Score",)):
+        """M-Score (or other columns) of one ticker for every stored fiscal period, oldest first"""
+        rows = self.query(columns=["ticker", "period", "run_date", "run_at", *columns],
+                          filters=[("ticker", "==", ticker)])
+        rows = self._latest_per_period(rows)
+        return rows.set_index("period")[list(columns)]
+
+    def flipped(self, component, since, to_high=True):
+        """Tickers whose `component` flag changed to High (or to Normal) in a fiscal period ending on or after `since`.
+
+        Each such period is compared with the same ticker's previous stored period.
+        Returns ticker, period, previous period and the component value.
+        """
+        since = pd.Timestamp(since)
+        flag = f"{component}_flag"
+        # The previous period can sit in the fiscal year before `since`
+        rows = self.query(
+            columns=["ticker", "period", "run_date", "run_at", component, flag],
+            filters=[("fiscal_year", ">=", since.year - 1)],
+        )
+        rows = self._latest_per_period(rows)
+        rows["previous_period"] = rows.groupby("ticker")["period"].shift(1)
+        previous_flag = rows.groupby("ticker")[flag].shift(1)
+
+        # Incomplete periods (NA flags) never count as a change
+        changed = ((rows[flag] == to_high) & (previous_flag == (not to_high))).fillna(False).astype(bool)
+        recent = rows["period"] >= since
+        return rows.loc[changed & recent, ["ticker", "period", "previous_period", component]].reset_index(drop=True)
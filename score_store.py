@@ -0,0 +1,84 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import beneish
+from beneish import LINE_ITEMS, m_score_arrays, pair_periods, scores_frame
+
+
+def coefficients_hash(coefficients=None):
+    """Hash of the model coefficients; scores computed under other coefficients are stale"""
+    coefficients = beneish.coefficients if coefficients is None else coefficients
+    return hashlib.sha256(json.dumps(coefficients, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def input_hashes(current, prior):
+    """Content hash (uint64) of each row's current and prior line items"""
+    pairs = pd.DataFrame(np.hstack([current, prior]))
+    return pd.util.hash_pandas_object(pairs, index=False).to_numpy()
+
+
+class ScoreStore:
+    """Persisted M-Scores keyed by (ticker, period), with the hash of the inputs behind each score.
+
+    rescore() only runs the engine on rows whose inputs (the period and its prior
+    period) changed since they were stored, or that were computed under different
+    coefficients or a different lag. The store is a single Parquet file.
+    """
+
+    def __init__(self, path="scores_store.parquet"):
+        self.path = path
+        if os.path.exists(path):
+            self.scores = pd.read_parquet(path)
+            if "lag" not in self.scores:
+                # Stores written before the lag was recorded only held annual scores
+                self.scores["lag"] = 1
+        else:
+            self.scores = None
+
+    def rescore(self, panel, lag=1):
+        """Return calculate_m_scores_batch(panel, lag), recomputing only changed rows.
+
+        The result also carries the "input_hash", "coefficients_hash" and "lag" columns.
+        Returns (scores, recomputed) where recomputed is the number of rows scored.
+        """
+        index, current, prior = pair_periods(panel, lag)
+        hashes = input_hashes(current, prior)
+        coef_hash = coefficients_hash()
+
+        if self.scores is not None:
+            # fill_value keeps the uint64 hashes exact for rows that are not stored yet
+            stored_hashes = self.scores["input_hash"].reindex(index, fill_value=0).to_numpy()
+            stored_coefs = self.scores["coefficients_hash"].reindex(index, fill_value="").to_numpy()
+            stored_lags = self.scores["lag"].reindex(index, fill_value=0).to_numpy()
+            changed = (stored_hashes != hashes) | (stored_coefs != coef_hash) | (stored_lags != lag)
+        else:
+            changed = np.ones(len(index), dtype=bool)
+
+        if changed.any() or self.scores is None:
+            m_score, components, weighted_components = m_score_arrays(
+                {item: current[changed, i] for i, item in enumerate(LINE_ITEMS)},
+                {item: prior[changed, i] for i, item in enumerate(LINE_ITEMS)},
+            )
+            fresh = scores_frame(index[changed], m_score, components, weighted_components)
+            fresh["input_hash"] = hashes[changed]
+            fresh["coefficients_hash"] = coef_hash
+            fresh["lag"] = lag
+
+            if self.scores is None:
+                self.scores = fresh
+            else:
+                kept = self.scores[~self.scores.index.isin(fresh.index)]
+                self.scores = pd.concat([kept, fresh])
+
+        return self.scores.reindex(index), int(changed.sum())
+
+    def save(self):
+        if self.scores is None:
+            # Nothing scored yet; leave any file on disk as it is
+            return
+        self.scores.to_parquet(self.path + ".tmp")
+        os.replace(self.path + ".tmp", self.path)
@@ -0,0 +1,165 @@
+import json
+import logging
+import os
+from functools import partial
+from itertools import islice
+
+import pandas as pd
+
+import metrics
+from beneish import (
+    COMPONENTS, TTM_LAG, calculate_m_scores_batch, fetch_financial_history, fetch_many, panel_from_history,
+)
+
+# Columns of every output row, in file order
+OUTPUT_COLUMNS = ["ticker", "period", "status", *COMPONENTS, "M-Score", "Manipulation Flag"]
+
+FORMATS = (".csv", ".jsonl", ".parquet")
+
+logger = logging.getLogger("beneish.screener")
+
+
+def output_format(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in FORMATS:
+        raise ValueError(f"Unsupported output format '{ext}', expected one of {', '.join(FORMATS)}")
+    return ext
+
+
+def read_tickers(path):
+    """Yield ticker symbols from a text file, one per line, skipping blanks and # comments"""
+    with open(path) as f:
+        for line in f:
+            ticker = line.split("#", 1)[0].strip().upper()
+            if ticker:
+                yield ticker
+
+
+def _truncate_partial_line(path):
+    # A crashed run can leave half a row at the end of a text file
+    with open(path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if size == 0:
+            return
+        f.seek(max(0, size - 65536))
+        tail = f.read()
+        if tail.endswith(b"\n"):
+            return
+        cut = tail.rfind(b"\n")
+        f.truncate(size - len(tail) + cut + 1 if cut >= 0 else 0)
+
+
+def completed_tickers(path):
+    """Return the set of tickers already written to an output file (empty if it doesn't exist).
+
+    Tickers whose only rows are "error" rows (the fetch failed) are not complete,
+    so a resumed run tries them again.
+    """
+    fmt = output_format(path)
+    if not os.path.exists(path):
+        return set()
+    if fmt == ".parquet":
+        rows = pd.read_parquet(path, columns=["ticker", "status"])
+    else:
+        _truncate_partial_line(path)
+        if os.path.getsize(path) == 0:
+            return set()
+        if fmt == ".csv":
+            # Tickers like "NA" and "NULL" must stay strings
+            rows = pd.read_csv(path, usecols=["ticker", "status"], dtype=str, keep_default_na=False)
+        else:
+            with open(path) as f:
+                records = [json.loads(line) for line in f if line.strip()]
+            rows = pd.DataFrame(records, columns=["ticker", "status"])
+    return set(rows.loc[rows["status"] != "error", "ticker"])
+
+
+def write_chunk(rows, path):
+    """Append a chunk of result rows to the output file and flush it to disk"""
+    fmt = output_format(path)
+    if fmt == ".parquet":
+        # Parquet files can't be appended to, so the output is a directory of part files
+        os.makedirs(path, exist_ok=True)
+        part = len([name for name in os.listdir(path) if name.endswith(".parquet")])
+        # Write then rename so a crash never leaves a truncated part; the leading dot
+        # keeps Parquet readers from picking up the temporary file
+        final = os.path.join(path, f"part-{part:05d}.parquet")
+        temporary = os.path.join(path, f".part-{part:05d}.parquet.tmp")
+        rows.to_parquet(temporary, index=False)
+        os.replace(temporary, final)
+    elif fmt == ".csv":
+        header = not os.path.exists(path) or os.path.getsize(path) == 0
+        rows.to_csv(path, mode="a", header=header, index=False)
+    else:
+        if len(rows):
+            # Older pandas versions leave off the final newline
+            text = rows.to_json(orient="records", lines=True)
+            with open(path, "a") as f:
+                f.write(text if text.endswith("\n") else text + "\n")
+
+
+def score_chunk(results, failed=(), lag=1):
+    """Turn a list of (ticker, history) fetch results into output rows, one per scored period.
+
+    Tickers in `failed` (fetch errors, not missing data) get a row with status "error".
+    Pass lag=TTM_LAG for quarterly TTM histories.
+    """
+    fetched = {ticker: history for ticker, history in results if history is not None and len(history)}
+    frames = []
+    scored = set()
+    if fetched:
+        scores = calculate_m_scores_batch(panel_from_history(fetched), lag).reset_index()
+        scores["period"] = scores["period"].dt.strftime("%Y-%m-%d")
+        # Rows missing a line item some index needs have no M-Score
+        scores["status"] = scores["M-Score"].isna().map({False: "ok", True: "incomplete"})
+        scored = set(scores["ticker"])
+        frames.append(scores)
+
+    # Tickers without at least two fiscal periods still get a row so a resumed run skips them;
+    # fetch errors are recorded too, but a resumed run retries them
+    unscored = [ticker for ticker, _ in results if ticker not in scored]
+    if unscored:
+        status = ["error" if ticker in failed else "no_data" for ticker in unscored]
+        frames.append(pd.DataFrame({"ticker": unscored, "period": None, "status": status}))
+
+    rows = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+    # Fixed dtypes so every chunk (and every Parquet part) shares one schema
+    rows = rows.reindex(columns=OUTPUT_COLUMNS)
+    return rows.astype({
+        "ticker": "string",
+        "period": "string",
+        "status": "string",
+        **{key: "float64" for key in [*COMPONENTS, "M-Score"]},
+        "Manipulation Flag": "boolean",
+    })
+
+
+def screen(input_path, output_path, chunk_size=500, max_workers=8, rate_limit=5.0, fetcher=None,
+           quarterly=False):
+    """Stream tickers from input_path through fetch -> score -> write.
+
+    Results are appended to output_path every chunk_size tickers. Tickers already
+    present in output_path are skipped, so an interrupted run can simply be restarted;
+    tickers whose fetch failed are tried again. With quarterly=True every trailing-twelve-month
+    window is scored (see extract_history) and fetcher must return TTM histories.
+    Returns the number of tickers processed in this run.
+    """
+    done = completed_tickers(output_path)
+    tickers = (ticker for ticker in read_tickers(input_path) if ticker not in done)
+    failed = set()
+    results = fetch_many(tickers, max_workers=max_workers, rate_limit=rate_limit,
+                         fetcher=fetcher or partial(fetch_financial_history, quarterly=quarterly),
+                         on_error=lambda ticker, error: failed.add(ticker))
+
+    processed = 0
+    while True:
+        chunk = list(islice(results, chunk_size))
+        if not chunk:
+            break
+        rows = score_chunk(chunk, failed, TTM_LAG if quarterly else 1)
+        with metrics.timer("write"):
+            write_chunk(rows, output_path)
+        processed += len(chunk)
+        logger.info("Screened %d tickers...", processed)
+    return processed
@@ -0,0 +1,277 @@
+import numpy as np
+import pandas as pd
+
+import beneish
+from beneish import (COMPONENT_INPUTS, COMPONENTS, LINE_ITEMS, M_SCORE_THRESHOLD, manipulation_flags,
+                     m_score_arrays, pair_periods)
+
+PERIODS = ("t", "t-1")
+
+# Model inputs in gradient order: every line item of the current period, then of the prior one
+INPUTS = tuple(f"{item} ({period})" for period in PERIODS for item in LINE_ITEMS)
+
+DISTRIBUTIONS = ("normal", "lognormal", "uniform")
+
+# Values per input array in one simulation chunk; bounds memory whatever the draw count
+CHUNK_ELEMENTS = 100_000
+
+
+def _input_scales(input_sd):
+    """Relative spread of every input as an array ordered like INPUTS.
+
+    `input_sd` is one number for all inputs, or a dict keyed by line item (both
+    periods) or by (line item, "t" / "t-1"); inputs not named get no noise.
+    """
+    if not isinstance(input_sd, dict):
+        return np.full(len(INPUTS), float(input_sd))
+    scales = np.zeros(len(INPUTS))
+    for p, period in enumerate(PERIODS):
+        for i, item in enumerate(LINE_ITEMS):
+            scales[p * len(LINE_ITEMS) + i] = input_sd.get((item, period), input_sd.get(item, 0.0))
+    return scales
+
+
+def _coefficient_scales(coefficient_sd):
+    names = ("Constant", *COMPONENTS)
+    if not isinstance(coefficient_sd, dict):
+        return {name: float(coefficient_sd) for name in names}
+    return {name: float(coefficient_sd.get(name, 0.0)) for name in names}
+
+
+def _noise(rng, shape, scales, distribution):
+    if distribution == "normal":
+        return 1 + scales * rng.standard_normal(shape)
+    if distribution == "lognormal":
+        return np.exp(scales * rng.standard_normal(shape))
+    return 1 + scales * rng.uniform(-1.0, 1.0, shape)
+
+
+def _row_rng(root, row):
+    # The row-th child of root.spawn(), built directly so rows can be seeded in any order
+    return np.random.default_rng(np.random.SeedSequence(root.entropy, spawn_key=(*root.spawn_key, row)))
+
+
+def _simulated_chunks(current, prior, draws, input_sd, coefficient_sd, distribution, seed):
+    # Yields (row slice, (rows, draws) scores) so callers never hold every draw at once.
+    # Every row draws from its own stream, so its scores don't depend on the chunking
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"unknown distribution {distribution!r}, expected one of {DISTRIBUTIONS}")
+    root = np.random.SeedSequence(seed)
+    values = np.hstack([np.asarray(current, dtype=float), np.asarray(prior, dtype=float)])
+    scales = _input_scales(input_sd)
+    coefficient_scales = _coefficient_scales(coefficient_sd)
+    perturbed = [name for name, scale in coefficient_scales.items() if scale]
+    noisy = np.flatnonzero(scales)
+    n_items = len(LINE_ITEMS)
+
+    chunk = max(1, CHUNK_ELEMENTS // draws)
+    for start in range(0, len(values), chunk):
+        block = values[start:start + chunk]
+        input_noise = np.empty((len(noisy), len(block), draws))
+        coefficient_noise = np.empty((len(perturbed), len(block), draws))
+        for r in range(len(block)):
+            rng = _row_rng(root, start + r)
+            input_noise[:, r] = _noise(rng, (len(noisy), draws), scales[noisy, None], distribution)
+            coefficient_noise[:, r] = rng.standard_normal((len(perturbed), draws))
+
+        # Input-major layout keeps each line item contiguous; inputs without noise stay broadcast
+        sampled = np.broadcast_to(block.T[:, :, None], (len(INPUTS), len(block), draws))
+        if len(noisy):
+            sampled = sampled.copy()
+            sampled[noisy] *= input_noise
+        _, components, _ = m_score_arrays(
+            {item: sampled[i] for i, item in enumerate(LINE_ITEMS)},
+            {item: sampled[n_items + i] for i, item in enumerate(LINE_ITEMS)},
+        )
+
+        # Weight the components with (possibly perturbed) coefficients
+        weights = {name: beneish.coefficients[name] for name in coefficient_scales}
+        for k, name in enumerate(perturbed):
+            weights[name] = weights[name] + coefficient_scales[name] * coefficient_noise[k]
+        m_score = np.broadcast_to(weights["Constant"], (len(block), draws)).copy()
+        for key in COMPONENTS:
+            m_score += weights[key] * components[key]
+        yield slice(start, start + len(block)), m_score
+
+
+def simulate_arrays(current, prior, draws=10_000, input_sd=0.05, coefficient_sd=0.0,
+                    distribution="normal", seed=None):
+    """Monte Carlo M-Scores for paired line-item arrays as returned by pair_periods.
+
+    Every input is multiplied by independent noise with relative spread `input_sd`
+    (see _input_scales): 1 + sd * N(0, 1) for "normal", exp(sd * N(0, 1)) for
+    "lognormal" and 1 + U(-sd, sd) for "uniform". `coefficient_sd` adds absolute
+    N(0, sd) noise to the coefficients, as one number or a dict keyed like
+    `coefficients`. Draws are scored with m_score_arrays in chunks of rows, so the
+    same rules apply as in calculate_m_scores_batch. Each row draws from its own
+    stream spawned from `seed`, so a row's draws don't depend on the other rows.
+
+    Returns every draw, an array of shape (rows, draws); simulate() summarizes
+    chunk by chunk instead, which is what large universes need.
+    """
+    scores = np.empty((len(current), draws))
+    for rows, chunk in _simulated_chunks(current, prior, draws, input_sd, coefficient_sd, distribution, seed):
+        scores[rows] = chunk
+    return scores
+
+
+def simulate(panel, draws=10_000, input_sd=0.05, coefficient_sd=0.0, distribution="normal", seed=None,
+             return_draws=False, lag=1):
+    """Distribution of the M-Score of every panel row under input (and coefficient) uncertainty.
+
+    `panel` is laid out as for calculate_m_scores_batch, and `lag` pairs periods the
+    same way (lag=TTM_LAG for quarterly TTM panels); see simulate_arrays for the
+    noise model. Returns a DataFrame indexed like calculate_m_scores_batch with the
+    unperturbed "M-Score" and "Manipulation Flag", the mean, standard deviation and
+    5th/95th percentiles of the simulated scores, "Flag Probability" (share of draws
+    above M_SCORE_THRESHOLD) and "Crossing Probability" (share of draws on the other
+    side of the threshold from the unperturbed score). Incomplete rows (NaN M-Score)
+    get NaN statistics.
+
+    The statistics are computed chunk by chunk, so memory doesn't grow with rows x
+    draws. With return_draws=True the (rows, draws) array of every draw is returned
+    as well, as (summary, draws).
+    """
+    index, current, prior = pair_periods(panel, lag)
+    m_score, _, _ = m_score_arrays(
+        {item: current[:, i] for i, item in enumerate(LINE_ITEMS)},
+        {item: prior[:, i] for i, item in enumerate(LINE_ITEMS)},
+    )
+
+    stats = np.full((len(index), 5), np.nan)  # mean, std, P5, P95, flag probability
+    all_draws = np.empty((len(index), draws)) if return_draws else None
+    for rows, scores in _simulated_chunks(current, prior, draws, input_sd, coefficient_sd, distribution, seed):
+        stats[rows, 0] = scores.mean(axis=1)
+        stats[rows, 1] = scores.std(axis=1)
+        stats[rows, 2:4] = np.percentile(scores, [5, 95], axis=1).T
+        stats[rows, 4] = (~(scores < M_SCORE_THRESHOLD)).mean(axis=1)
+        if return_draws:
+            all_draws[rows] = scores
+
+    incomplete = np.isnan(m_score)
+    flag_probability = np.where(incomplete, np.nan, stats[:, 4])
+    summary = pd.DataFrame({
+        "M-Score": m_score,
+        "Manipulation Flag": manipulation_flags(m_score),
+        "M-Score Mean": stats[:, 0],
+        "M-Score Std": stats[:, 1],
+        "M-Score P5": stats[:, 2],
+        "M-Score P95": stats[:, 3],
+        "Flag Probability": flag_probability,
+        "Crossing Probability": np.where(m_score < M_SCORE_THRESHOLD, flag_probability, 1 - flag_probability),
+    }, index=index)
+    return (summary, all_draws) if return_draws else summary
+
+
+# Forward-mode derivatives: a quantity is (value, gradient), where the gradient has
+# one trailing entry per name in INPUTS
+
+def _div(a, b):
+    # Same rule as safe_divide_array: a zero denominator gives 1.0, which is constant
+    (a_value, a_grad), (b_value, b_grad) = a, b
+    zero = b_value == 0
+    denominator = np.where(zero, 1.0, b_value)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        ratio = a_value / denominator
+        grad = (a_grad - ratio[..., None] * b_grad) / denominator[..., None]
+    return np.where(zero, 1.0, ratio), np.where(zero[..., None], 0.0, grad)
+
+
+def _add(a, b):
+    return a[0] + b[0], a[1] + b[1]
+
+
+def _sub(a, b):
+    return a[0] - b[0], a[1] - b[1]
+
+
+def _one_minus(a):
+    return 1 - a[0], -a[1]
+
+
+def gradient_arrays(current, prior):
+    """Analytic partial derivatives of the eight indices and the M-Score.
+
+    `current` and `prior` are (rows, len(LINE_ITEMS)) arrays as returned by
+    pair_periods. Returns (m_score, components, gradients): gradients maps each
+    index name and "M-Score" to a (rows, len(INPUTS)) array of derivatives with
+    respect to the inputs. Where the model substitutes a default (zero
+    denominator, non-finite index) the derivative is 0, matching m_score_arrays;
+    indices with a missing input, and the M-Score then, are NaN along with their
+    derivatives.
+    """
+    values = np.hstack([np.asarray(current, dtype=float), np.asarray(prior, dtype=float)])
+    identity = np.eye(len(INPUTS))
+    n_items = len(LINE_ITEMS)
+    cur = {item: (values[:, i], np.broadcast_to(identity[i], values.shape)) for i, item in enumerate(LINE_ITEMS)}
+    pri = {item: (values[:, n_items + i], np.broadcast_to(identity[n_items + i], values.shape))
+           for i, item in enumerate(LINE_ITEMS)}
+
+    revenue, prior_revenue = cur["Total Revenue"], pri["Total Revenue"]
+    assets, prior_assets = cur["Total Assets"], pri["Total Assets"]
+    indices = {
+        "DSRI": _div(_div(cur["Accounts Receivable"], revenue), _div(pri["Accounts Receivable"], prior_revenue)),
+        "GMI": _div(_div(_sub(prior_revenue, pri["Cost Of Revenue"]), prior_revenue),
+                    _div(_sub(revenue, cur["Cost Of Revenue"]), revenue)),
+        "AQI": _div(_one_minus(_div(_add(cur["Current Assets"], cur["Net PPE"]), assets)),
+                    _one_minus(_div(_add(pri["Current Assets"], pri["Net PPE"]), prior_assets))),
+        "SGI": _div(revenue, prior_revenue),
+        "DEPI": _div(_div(pri["Depreciation"], _add(pri["Net PPE"], pri["Depreciation"])),
+                     _div(cur["Depreciation"], _add(cur["Net PPE"], cur["Depreciation"]))),
+        "SGAI": _div(_div(cur["Selling General And Administration"], revenue),
+                     _div(pri["Selling General And Administration"], prior_revenue)),
+        "TATA": _div(_sub(cur["Net Income"], cur["Operating Cash Flow"]), assets),
+        "LVGI": _div(_div(cur["Total Liabilities Net Minority Interest"], assets),
+                     _div(pri["Total Liabilities Net Minority Interest"], prior_assets)),
+    }
+
+    components = {}
+    gradients = {}
+    m_score = np.full(len(values), beneish.coefficients["Constant"])
+    m_score_grad = np.zeros(values.shape)
+    for key, (value, grad) in indices.items():
+        current_items, prior_items = COMPONENT_INPUTS[key]
+        incomplete = np.zeros(len(values), dtype=bool)
+        for item in current_items:
+            incomplete |= np.isnan(cur[item][0])
+        for item in prior_items:
+            incomplete |= np.isnan(pri[item][0])
+        finite = np.isfinite(value)
+        components[key] = np.where(incomplete, np.nan, np.where(finite, value, 1.0))
+        gradients[key] = np.where(incomplete[:, None], np.nan,
+                                  np.where(finite[:, None] & np.isfinite(grad), grad, 0.0))
+        m_score = m_score + beneish.coefficients[key] * components[key]
+        m_score_grad = m_score_grad + beneish.coefficients[key] * gradients[key]
+    gradients["M-Score"] = m_score_grad
+    return m_score, components, gradients
+
+
+def sensitivities(panel, target="M-Score", elasticity=True, lag=1):
+    """Sensitivity of the M-Score (or one index) of every panel row to each input.
+
+    With elasticity=True (the default) each column is input * derivative, i.e. the
+    change in `target` for a 100% change in that input, which makes inputs of
+    different sizes comparable; otherwise the raw partial derivatives. Columns are
+    named like INPUTS; the index matches calculate_m_scores_batch(panel, lag).
+    """
+    index, current, prior = pair_periods(panel, lag)
+    _, _, gradients = gradient_arrays(current, prior)
+    values = gradients[target]
+    if elasticity:
+        values = values * np.hstack([current, prior])
+    return pd.DataFrame(values, index=index, columns=list(INPUTS))
+
+
+def top_drivers(sensitivity, n=3):
+    """The `n` inputs with the largest absolute sensitivity per row, as "input: value" strings.
+
+    Incomplete rows (all NaN) get None.
+    """
+    values = sensitivity.to_numpy()
+    order = np.argsort(-np.abs(np.nan_to_num(values)), axis=1)[:, :n]
+    names = np.asarray(sensitivity.columns)
+    rows = [
+        [f"{names[j]}: {values[r, j]:+.3f}" for j in order[r]] if not np.isnan(values[r]).all() else [None] * len(order[r])
+        for r in range(len(values))
+    ]
+    return pd.DataFrame(rows, index=sensitivity.index, columns=[f"Driver {i + 1}" for i in range(order.shape[1])])
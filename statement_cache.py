@@ -0,0 +1,178 @@
+import os
+import shutil
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+
+# Statements cached per ticker, in the order fetch_statements returns them
+STATEMENTS = ("income_stmt", "balance_sheet", "cash_flow")
+
+
+class StatementCache:
+    """On-disk cache of yfinance financial statements.
+
+    Each statement is stored as one Parquet file per ticker
+    (<directory>/<TICKER>/<statement>.parquet, with a quarterly_ prefix for
+    quarterly statements) with one row per fiscal period end
+    and one column per line item. A file's modification time is the time it was
+    fetched; its access time is bumped on every hit and drives LRU eviction.
+
+    ttl: seconds after which an entry is refetched.
+    refresh_on_new_period: when True, an entry is only refetched once a new fiscal
+        period is due (latest cached period end + period_days + filing_lag_days) and
+        at most once per ttl after that.
+    max_bytes: total cache size; least recently used tickers are evicted beyond it.
+    """
+
+    def __init__(self, directory=".beneish_cache", ttl=7 * 24 * 3600, refresh_on_new_period=False,
+                 period_days=365, filing_lag_days=90, max_bytes=512 * 1024 * 1024):
+        self.directory = directory
+        self.ttl = ttl
+        self.refresh_on_new_period = refresh_on_new_period
+        self.period_days = period_days
+        self.filing_lag_days = filing_lag_days
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = None  # ticker -> size in bytes, least recently used first
+
+    def __getstate__(self):
+        # Locks can't be pickled; worker processes get their own lock and index
+        state = self.__dict__.copy()
+        del state["_lock"]
+        state["_entries"] = None
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _path(self, ticker, statement, quarterly=False):
+        name = f"quarterly_{statement}" if quarterly else statement
+        return os.path.join(self.directory, ticker.upper(), f"{name}.parquet")
+
+    def _ticker_paths(self, ticker):
+        # Annual and quarterly files currently on disk for ticker
+        paths = [self._path(ticker, statement, quarterly)
+                 for quarterly in (False, True) for statement in STATEMENTS]
+        return [path for path in paths if os.path.exists(path)]
+
+    def _load_index(self):
+        # Built once from disk, then kept up to date in memory
+        if self._entries is not None:
+            return self._entries
+        found = []
+        if os.path.isdir(self.directory):
+            for ticker in os.listdir(self.directory):
+                stats = [os.stat(path) for path in self._ticker_paths(ticker)]
+                if stats:
+                    found.append((max(s.st_atime for s in stats), ticker, sum(s.st_size for s in stats)))
+        found.sort()
+        self._entries = OrderedDict((ticker, size) for _, ticker, size in found)
+        return self._entries
+
+    def _is_fresh(self, fetched_at, statements, quarterly):
+        import pandas as pd
+
+        now = time.time()
+        if now - fetched_at <= self.ttl:
+            return True
+        if not self.refresh_on_new_period:
+            return False
+        # Past the TTL, but no new fiscal period can have been filed yet
+        latest = max((frame.columns.max() for frame in statements if len(frame.columns)), default=None)
+        if latest is None:
+            return False
+        period_days = self.period_days / 4 if quarterly else self.period_days
+        due = pd.Timestamp(latest) + pd.Timedelta(days=period_days + self.filing_lag_days)
+        return pd.Timestamp.now() < due
+
+    def get(self, ticker, quarterly=False):
+        """Return the cached (income_stmt, balance_sheet, cash_flow) for ticker, or None on a miss"""
+        import pandas as pd
+
+        paths = [self._path(ticker, statement, quarterly) for statement in STATEMENTS]
+        try:
+            fetched_at = min(os.path.getmtime(path) for path in paths)
+            statements = tuple(pd.read_parquet(path).T for path in paths)
+        except (OSError, ValueError):
+            with self._lock:
+                self.misses += 1
+            if metrics.enabled:
+                metrics.incr("cache_miss")
+            return None
+
+        if not self._is_fresh(fetched_at, statements, quarterly):
+            with self._lock:
+                self.misses += 1
+            if metrics.enabled:
+                metrics.incr("cache_miss")
+            return None
+
+        # Record the access for LRU eviction without touching the fetch time
+        now = time.time()
+        for path in paths:
+            os.utime(path, (now, os.path.getmtime(path)))
+        if metrics.enabled:
+            metrics.incr("cache_hit")
+        with self._lock:
+            self.hits += 1
+            entries = self._load_index()
+            if ticker.upper() in entries:
+                entries.move_to_end(ticker.upper())
+        return statements
+
+    def put(self, ticker, statements, quarterly=False):
+        """Store (income_stmt, balance_sheet, cash_flow) for ticker and evict old entries if needed"""
+        if all(frame.empty for frame in statements):
+            return
+        os.makedirs(os.path.join(self.directory, ticker.upper()), exist_ok=True)
+        for statement, frame in zip(STATEMENTS, statements):
+            path = self._path(ticker, statement, quarterly)
+            # One row per fiscal period end, one column per line item
+            table = frame.T.astype("float64")
+            table.columns = table.columns.astype(str)
+            table.to_parquet(path + ".tmp")
+            os.replace(path + ".tmp", path)
+        size = sum(os.stat(path).st_size for path in self._ticker_paths(ticker))
+
+        with self._lock:
+            entries = self._load_index()
+            entries[ticker.upper()] = size
+            entries.move_to_end(ticker.upper())
+            self._evict(entries)
+
+    def _evict(self, entries):
+        total = sum(entries.values())
+        while total > self.max_bytes and len(entries) > 1:
+            ticker, size = entries.popitem(last=False)
+            shutil.rmtree(os.path.join(self.directory, ticker), ignore_errors=True)
+            total -= size
+            self.evictions += 1
+
+    def invalidate(self, ticker=None):
+        """Drop one ticker from the cache, or everything when ticker is None"""
+        with self._lock:
+            entries = self._load_index()
+            if ticker is None:
+                shutil.rmtree(self.directory, ignore_errors=True)
+                entries.clear()
+            else:
+                shutil.rmtree(os.path.join(self.directory, ticker.upper()), ignore_errors=True)
+                entries.pop(ticker.upper(), None)
+
+    @property
+    def stats(self):
+        with self._lock:
+            entries = self._load_index()
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "tickers": len(entries),
+                "bytes": sum(entries.values()),
+            }
@@ -0,0 +1,11 @@
+import pytest
+
+from benchmark import IMPORT_BUDGETS, measure_import
+
+
+@pytest.mark.parametrize("module, budget", IMPORT_BUDGETS.items())
+def test_import_budget(module, budget):
+    # Each import runs in a fresh interpreter, like a CLI start
+    record = measure_import(module, budget)
+    assert not record["eager_packages"], f"import {module} loads {', '.join(record['eager_packages'])}"
+    assert record["seconds"] <= budget, f"import {module} took {record['seconds'] * 1000:.1f} ms"
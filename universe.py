@@ -0,0 +1,156 @@
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+
+import numpy as np
+import pandas as pd
+
+import beneish
+from beneish import COMPONENTS, TokenBucket, calculate_m_scores_batch, fetch_many, manipulation_flags, panel_from_history
+
+# Rate limiters of this worker process, by rate; every shard the process runs shares one
+_buckets = {}
+
+
+@dataclass
+class ShardReport:
+    """What happened to one shard of the universe"""
+    shard: int
+    tickers: int
+    scored: int
+    seconds: float
+    errors: list = field(default_factory=list)  # (ticker, message) pairs
+
+
+def _shard_result(shard, tickers, panel, errors, start):
+    # Returns plain arrays, which pickle far smaller than frames of dicts
+    if panel is not None and len(panel):
+        scores = calculate_m_scores_batch(panel)
+        ticker_column = scores.index.get_level_values(0).to_numpy(dtype=str)
+        periods = scores.index.get_level_values(1).to_numpy(dtype="datetime64[ns]")
+        values = scores[[*COMPONENTS, "M-Score"]].to_numpy()
+        scored = len(np.unique(ticker_column))
+    else:
+        ticker_column = np.array([], dtype=str)
+        periods = np.array([], dtype="datetime64[ns]")
+        values = np.empty((0, len(COMPONENTS) + 1))
+        scored = 0
+
+    report = ShardReport(shard, len(tickers), scored, time.perf_counter() - start, errors)
+    return ticker_column, periods, values, report
+
+
+def _process_bucket(rate_limit):
+    if not rate_limit:
+        return None
+    if rate_limit not in _buckets:
+        _buckets[rate_limit] = TokenBucket(rate_limit)
+    return _buckets[rate_limit]
+
+
+def _score_shard(shard, tickers, source, coefficients, threads, rate_limit):
+    # Runs in a worker process and fetches the shard ticker by ticker
+    start = time.perf_counter()
+    beneish.coefficients.update(coefficients)
+
+    histories = {}
+    errors = []
+    failed = set()
+
+    def record_error(ticker, error):
+        # Called by fetch_many once its retries are exhausted
+        failed.add(ticker)
+        errors.append((ticker, f"{type(error).__name__}: {error}"))
+
+    for ticker, history in fetch_many(tickers, max_workers=threads, bucket=_process_bucket(rate_limit),
+                                      rate_limit=None, fetcher=source.history, on_error=record_error):
+        if history is not None and len(history) >= 2:
+            histories[ticker] = history
+        elif ticker not in failed:
+            errors.append((ticker, "insufficient data"))
+
+    # Score in input order so the merged result doesn't depend on fetch completion order
+    ordered = {ticker: histories[ticker] for ticker in tickers if ticker in histories}
+    panel = panel_from_history(ordered) if ordered else None
+    return _shard_result(shard, tickers, panel, errors, start)
+
+
+def _score_panel_shard(shard, tickers, panel, coefficients):
+    # Runs in a worker process on the shard's rows of a panel loaded once by the parent
+    start = time.perf_counter()
+    beneish.coefficients.update(coefficients)
+
+    periods = panel.groupby(level=0, sort=False).size()
+    errors = [(ticker, "insufficient data") for ticker in tickers if periods.get(ticker, 0) < 2]
+    kept = [ticker for ticker in tickers if periods.get(ticker, 0) >= 2]
+    # Input order, as in _score_shard
+    panel = panel.loc[kept] if kept else None
+    return _shard_result(shard, tickers, panel, errors, start)
+
+
+def shard(tickers, shards):
+    """Split tickers into `shards` contiguous, nearly equal slices"""
+    bounds = np.linspace(0, len(tickers), shards + 1).round().astype(int)
+    return [tickers[lo:hi] for lo, hi in zip(bounds[:-1], bounds[1:]) if hi > lo]
+
+
+def score_universe(tickers, processes=4, source=None, shards_per_process=4, threads=4, rate_limit=5.0):
+    """Score a ticker universe across a process pool.
+
+    Tickers are split into processes * shards_per_process contiguous shards so slow
+    shards don't leave cores idle. Each worker fetches its shard through `source`
+    (a DataSource, default YFinanceSource) with `threads` concurrent fetches and
+    scores it with the batch engine. `rate_limit` is the total fetch rate per second
+    shared by all workers (None disables it, e.g. for a local source). Sources that hold a whole panel (DataSource.holds_panel, e.g.
+    BulkFileSource) are read once here instead, and each worker receives only its
+    shard's rows. The merge follows shard order, so the result is deterministic:
+    tickers appear in input order, periods oldest first.
+
+    Returns (scores, reports): a DataFrame laid out like calculate_m_scores_batch
+    and one ShardReport per shard.
+    """
+    if source is None:
+        from data_sources import YFinanceSource
+        source = YFinanceSource()
+
+    tickers = list(dict.fromkeys(tickers))
+    shards = shard(tickers, max(1, processes * shards_per_process))
+    per_process_rate = rate_limit / processes if rate_limit else None
+
+    coefficients = dict(beneish.coefficients)
+
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        if source.holds_panel:
+            panel = source.panel(tickers)
+            panel_tickers = panel.index.get_level_values(0)
+            futures = [
+                executor.submit(_score_panel_shard, i, chunk, panel[panel_tickers.isin(chunk)], coefficients)
+                for i, chunk in enumerate(shards)
+            ]
+        else:
+            futures = [
+                executor.submit(_score_shard, i, chunk, source, coefficients, threads, per_process_rate)
+                for i, chunk in enumerate(shards)
+            ]
+        results = []
+        for i, future in enumerate(futures):
+            try:
+                results.append(future.result())
+            except Exception as e:
+                # A crashed worker loses only its own shard
+                report = ShardReport(i, len(shards[i]), 0, 0.0, [(ticker, f"shard failed: {e}") for ticker in shards[i]])
+                results.append((np.array([], dtype=str), np.array([], dtype="datetime64[ns]"),
+                                np.empty((0, len(COMPONENTS) + 1)), report))
+
+    ticker_column = np.concatenate([r[0] for r in results]) if results else np.array([], dtype=str)
+    periods = np.concatenate([r[1] for r in results]) if results else np.array([], dtype="datetime64[ns]")
+    values = np.vstack([r[2] for r in results]) if results else np.empty((0, len(COMPONENTS) + 1))
+    reports = [r[3] for r in results]
+
+    index = pd.MultiIndex.from_arrays([ticker_column, periods], names=["ticker", "period"])
+    scores = pd.DataFrame(values[:, :len(COMPONENTS)], index=index, columns=list(COMPONENTS))
+    for key in COMPONENTS:
+        scores[f"{key}_weighted"] = beneish.coefficients[key] * scores[key]
+    scores["M-Score"] = values[:, -1]
+    scores["Manipulation Flag"] = manipulation_flags(values[:, -1])
+    return scores, reports